@@ -0,0 +1,199 @@
+"""
+This file contains the batch mode : it solves a stream of puzzles, one per line, on a pool of worker processes.
+Puzzles use the usual one line notation : the values of the cells row after row, "." or "0" meaning unknown.
+Results are written in input order, as tab separated lines : solution, seconds, generations, exit reason
+With a solution cache (see the solution_cache module), puzzles already solved, or isomorphic to a solved one,
+are answered from the cache with the CACHED exit reason. Only the genetic engine uses it :
+the exact engine solves a puzzle faster than the cache finds its canonical form
+"""
+import argparse
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from time import perf_counter
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from SudokuSolver.exact import BitmaskSolver
+from SudokuSolver.genetic import ExitReasons, GeneticEngine
+from SudokuSolver.solution_cache import SolutionCache
+from SudokuSolver.sudoku import Cell, GridSpec, Position, Sudoku
+
+UNKNOWN_CHARACTERS = ".0"
+
+
+class BatchResult(NamedTuple):
+    """The outcome of solving one puzzle of a batch"""
+
+    solution: str
+    seconds: float
+    generations: int
+    exit_reason: str
+
+    def __str__(self):
+        return f"{self.solution}\t{self.seconds:.6f}\t{self.generations}\t{self.exit_reason}"
+
+
+def parse_line(line: str) -> Tuple[List[int], int]:
+    """
+    Returns the values of the cells of a one line puzzle (0 meaning unknown) and the width of the grid
+    Raises ValueError if line is not a puzzle
+    """
+    width = int(len(line) ** 0.5)
+    if width * width != len(line) or not 1 < width <= 9:
+        raise ValueError(f"A puzzle of {len(line)} characters is not supported")
+    values = [0 if character in UNKNOWN_CHARACTERS else int(character) for character in line]
+    if any(value > width for value in values):
+        raise ValueError(f"The values of a {width}x{width} puzzle must be between 1 and {width}")
+    return values, width
+
+
+def format_values(values: Iterable[int]) -> str:
+    """Returns the one line notation of values"""
+    return "".join(str(value) if value else "." for value in values)
+
+
+def build_cells(values: List[int], width: int) -> Set[Cell]:
+    """Returns the given cells of a grid, as used by Sudoku"""
+    return {Cell(Position((index % width, index // width)), value) for index, value in enumerate(values) if value}
+
+
+@lru_cache(maxsize=8)
+def get_exact_solver(width: int) -> BitmaskSolver:
+    """Solvers are built once per grid size and worker process"""
+    return BitmaskSolver(GridSpec.get(width))
+
+
+@lru_cache(maxsize=2)
+def get_solution_cache(path: str) -> SolutionCache:
+    """Each worker process opens the cache once"""
+    return SolutionCache(path)
+
+
+def solve_exact(values: List[int], width: int) -> Tuple[List[int], int, int]:
+    """Returns the solution, the generation count (always 0) and the exit reason of the exact engine"""
+    solutions = get_exact_solver(width).solve(values)
+    if not solutions:
+        return values, 0, ExitReasons.NO_SOLUTION
+    return solutions[0], 0, ExitReasons.SUCCESS
+
+
+def solve_genetic(
+    values: List[int], width: int, population_size: int, max_generations: Optional[int]
+) -> Tuple[List[int], int, int]:
+    """
+    Returns the best grid found, the generation count and the exit reason of the genetic engine
+    Stuck populations are restarted like GeneticEngine.run does, until max_generations is reached
+    """
+    engine = GeneticEngine(
+        Sudoku, population_size, given_cells=build_cells(values, width), grid_spec=GridSpec.get(width), observers=[]
+    )
+    outcome = engine.run_until(max_generations)
+    solution = values if outcome.best_individual is None else outcome.best_individual.genome.tolist()
+    return solution, outcome.generations, outcome.exit_reason
+
+
+def solve_lines(
+    lines: List[str],
+    engine: str,
+    population_size: int,
+    max_generations: Optional[int],
+    cache_path: Optional[str] = None,
+) -> List[BatchResult]:
+    """Solves a chunk of puzzles. Runs in a worker process"""
+    cache = get_solution_cache(cache_path) if cache_path and engine != "exact" else None
+    results = []
+    for line in lines:
+        start = perf_counter()
+        try:
+            values, width = parse_line(line)
+        except ValueError:
+            results.append(BatchResult(line, 0, 0, "INVALID"))
+            continue
+        solution = cache.get(values) if cache is not None else None
+        if solution is not None:
+            results.append(BatchResult(format_values(solution), perf_counter() - start, 0, "CACHED"))
+            continue
+        if engine == "exact":
+            solution, generations, exit_reason = solve_exact(values, width)
+        else:
+            solution, generations, exit_reason = solve_genetic(values, width, population_size, max_generations)
+        if cache is not None and exit_reason == ExitReasons.SUCCESS:
+            cache.put(values, solution)
+        results.append(
+            BatchResult(format_values(solution), perf_counter() - start, generations, ExitReasons.name(exit_reason))
+        )
+    return results
+
+
+def solve_stream(
+    lines: Iterable[str],
+    engine: str = "exact",
+    max_workers: Optional[int] = None,
+    chunk_size: int = 64,
+    population_size: int = 1000,
+    max_generations: Optional[int] = 10000,
+    cache_path: Optional[str] = None,
+) -> Iterator[BatchResult]:
+    """
+    Solves each puzzle of lines on a pool of worker processes and yields the results in input order
+    The puzzles are sent to the workers by chunks of chunk_size, and only a few chunks per worker are read in advance,
+    so that the memory used does not depend on the number of puzzles
+    """
+    if engine not in ("exact", "genetic"):
+        raise ValueError(f"Unknown engine {engine}")
+    puzzles = (line.strip() for line in lines)
+    puzzles = (line for line in puzzles if line and not line.startswith("#"))
+    max_workers = max_workers or os.cpu_count() or 1
+    max_pending_chunks = 2 * max_workers
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=Sudoku.seed) as executor:
+        pending = deque()
+        while True:
+            chunk = list(islice(puzzles, chunk_size))
+            if chunk:
+                pending.append(
+                    executor.submit(solve_lines, chunk, engine, population_size, max_generations, cache_path)
+                )
+            if pending and (len(pending) >= max_pending_chunks or not chunk):
+                yield from pending.popleft().result()
+            elif not chunk:
+                break
+
+
+def main(arguments: Optional[List[str]] = None):
+    """Command line entry point : python -m SudokuSolver.batch puzzles.txt -o results.tsv"""
+    parser = argparse.ArgumentParser(description="Solve a stream of one line puzzles")
+    parser.add_argument("input", nargs="?", default="-", help="file of puzzles, one per line. Defaults to stdin")
+    parser.add_argument("-o", "--output", default="-", help="file where to write the results. Defaults to stdout")
+    parser.add_argument("-e", "--engine", choices=("exact", "genetic"), default="exact")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("-c", "--chunk-size", type=int, default=64, help="number of puzzles sent at once to a worker")
+    parser.add_argument("-p", "--population-size", type=int, default=1000)
+    parser.add_argument("-g", "--max-generations", type=int, default=10000, help="per puzzle, for the genetic engine")
+    parser.add_argument("--cache", help="SQLite file where solutions are looked up and stored, by the genetic engine")
+    options = parser.parse_args(arguments)
+
+    input_file = sys.stdin if options.input == "-" else open(options.input)
+    output_file = sys.stdout if options.output == "-" else open(options.output, "w")
+    try:
+        for result in solve_stream(
+            input_file,
+            options.engine,
+            options.workers,
+            options.chunk_size,
+            options.population_size,
+            options.max_generations,
+            options.cache,
+        ):
+            print(result, file=output_file)
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+
+
+if __name__ == "__main__":
+    main()
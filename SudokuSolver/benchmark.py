@@ -0,0 +1,175 @@
+"""
+This file contains the benchmark suite : it runs the genetic algorithm on the grids of the grids module,
+for several population sizes and seeds, and compares the results with a baseline saved by a previous run.
+
+    python -m SudokuSolver.benchmark --save baseline.json
+    python -m SudokuSolver.benchmark --compare baseline.json --threshold 0.2
+"""
+import argparse
+import json
+import sys
+from multiprocessing import Pool
+from time import perf_counter
+from typing import Dict, Iterator, List, NamedTuple, Optional, Set
+
+from SudokuSolver import grids
+from SudokuSolver.genetic import ExitReasons, GeneticEngine
+from SudokuSolver.sudoku import Cell, Sudoku
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+class BenchmarkCase(NamedTuple):
+    grid_name: str
+    population_size: int
+    seed: int
+    max_generations: int
+
+
+class BenchmarkResult(NamedTuple):
+    """The outcome of a benchmark case"""
+
+    grid_name: str
+    population_size: int
+    seed: int
+    seconds: float
+    generations: int
+    restarts: int
+    evaluations_per_second: float
+    # The peak resident memory of the process running the case, in KB. None if it can not be measured
+    peak_memory: Optional[int]
+    exit_reason: str
+
+    @property
+    def key(self):
+        return self.grid_name, self.population_size, self.seed
+
+    def __str__(self):
+        return (
+            f"{self.grid_name:<20}{self.population_size:>8}{self.seed:>6}{self.seconds:>10.2f}{self.generations:>8}"
+            f"{self.restarts:>6}{self.evaluations_per_second:>12.0f}{self.peak_memory or 0:>10}  {self.exit_reason}"
+        )
+
+
+HEADER = (
+    f"{'grid':<20}{'pop':>8}{'seed':>6}{'seconds':>10}{'gens':>8}{'rest.':>6}{'evals/s':>12}{'peak KB':>10}  exit"
+)
+
+
+def bundled_grids() -> Dict[str, Set[Cell]]:
+    """Returns the grids of the grids module by name, in the order they are defined"""
+    return {name: value for name, value in vars(grids).items() if isinstance(value, set) and not name.startswith("_")}
+
+
+def peak_memory() -> Optional[int]:
+    """Returns the peak resident memory of the current process in KB"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KB elsewhere
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def run_case(case: BenchmarkCase) -> BenchmarkResult:
+    """
+    Solves a grid with the genetic algorithm, restarting stuck populations like GeneticEngine.run does
+    until it is solved or max_generations generations have been run. Runs in its own worker process
+    """
+    Sudoku.seed(case.seed)
+    engine = GeneticEngine(Sudoku, case.population_size, given_cells=bundled_grids()[case.grid_name], observers=[])
+    start = perf_counter()
+    outcome = engine.run_until(case.max_generations)
+    seconds = perf_counter() - start
+    return BenchmarkResult(
+        case.grid_name,
+        case.population_size,
+        case.seed,
+        seconds,
+        outcome.generations,
+        len(engine.restarts),
+        case.population_size * outcome.generations / seconds,
+        peak_memory(),
+        ExitReasons.name(outcome.exit_reason),
+    )
+
+
+def run_benchmark(cases: List[BenchmarkCase], max_workers: int = 1) -> Iterator[BenchmarkResult]:
+    """
+    Runs each case in a new worker process, so that the peak memory of a case does not include the previous ones
+    Running several workers at once makes the timings less reliable
+    """
+    with Pool(max_workers, maxtasksperchild=1) as pool:
+        yield from pool.imap(run_case, cases)
+
+
+def save_baseline(path: str, results: List[BenchmarkResult]):
+    with open(path, "w") as file:
+        json.dump([result._asdict() for result in results], file, indent=1)
+
+
+def load_baseline(path: str) -> Dict[tuple, BenchmarkResult]:
+    with open(path) as file:
+        results = [BenchmarkResult(**result) for result in json.load(file)]
+    return {result.key: result for result in results}
+
+
+def find_regressions(result: BenchmarkResult, baseline: BenchmarkResult, threshold: float) -> List[str]:
+    """Returns the descriptions of the regressions of result compared to baseline. threshold is a ratio"""
+    regressions = []
+    if baseline.exit_reason == ExitReasons.name(ExitReasons.SUCCESS) and result.exit_reason != baseline.exit_reason:
+        regressions.append(f"not solved anymore ({result.exit_reason})")
+    if result.seconds > baseline.seconds * (1 + threshold):
+        regressions.append(f"time {baseline.seconds:.2f}s -> {result.seconds:.2f}s")
+    if result.evaluations_per_second < baseline.evaluations_per_second / (1 + threshold):
+        regressions.append(
+            f"evaluations per second {baseline.evaluations_per_second:.0f} -> {result.evaluations_per_second:.0f}"
+        )
+    if result.peak_memory and baseline.peak_memory and result.peak_memory > baseline.peak_memory * (1 + threshold):
+        regressions.append(f"peak memory {baseline.peak_memory} KB -> {result.peak_memory} KB")
+    return regressions
+
+
+def main(arguments: Optional[List[str]] = None) -> int:
+    """Command line entry point. Returns 1 if a regression has been found, 0 otherwise"""
+    grid_names = list(bundled_grids())
+    parser = argparse.ArgumentParser(description="Benchmark the genetic algorithm on the bundled grids")
+    parser.add_argument("-g", "--grids", nargs="+", choices=grid_names, default=grid_names)
+    parser.add_argument("-p", "--population-sizes", nargs="+", type=int, default=[1000])
+    parser.add_argument("-s", "--seeds", nargs="+", type=int, default=[0, 1, 2])
+    parser.add_argument("-m", "--max-generations", type=int, default=2000, help="per case, restarts included")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="number of cases run at once")
+    parser.add_argument("--save", help="file where to save the results as a baseline")
+    parser.add_argument("--compare", help="baseline file to compare the results with")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change considered as a regression")
+    options = parser.parse_args(arguments)
+
+    baseline = load_baseline(options.compare) if options.compare else {}
+    cases = [
+        BenchmarkCase(grid_name, population_size, seed, options.max_generations)
+        for grid_name in options.grids
+        for population_size in options.population_sizes
+        for seed in options.seeds
+    ]
+
+    print(HEADER)
+    results, regression_number = [], 0
+    for result in run_benchmark(cases, options.workers):
+        results.append(result)
+        print(result)
+        if result.key in baseline:
+            for regression in find_regressions(result, baseline[result.key], options.threshold):
+                regression_number += 1
+                print(f"    REGRESSION : {regression}")
+
+    if options.save:
+        save_baseline(options.save, results)
+    if options.compare:
+        print(f"{regression_number} regression(s) compared to {options.compare}")
+    return 1 if regression_number else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
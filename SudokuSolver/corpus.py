@@ -0,0 +1,410 @@
+"""
+This file contains the puzzle corpus : a compact array of puzzles, one byte per cell, with random access,
+and the importer building it from the usual text formats :
+    lines : one puzzle per line, the values of the cells row after row, "." or "0" meaning unknown.
+            Anything after the puzzle, separated by a comma, a space or a tab, is ignored
+    csv : "puzzle,solution" lines, as found in the big public dumps. The header line is skipped
+    sdk : a grid written on as many lines as it has rows, "#" starting a comment line
+Values above 9 are written as letters : A for 10, B for 11...
+
+Text files are read by chunks through mmap and parsed with numpy, so that importing millions of puzzles
+only takes seconds and never needs much more memory than the corpus itself.
+A corpus can be saved as a corpus file : a header followed by fixed size records, read back through mmap.
+
+Layout of a corpus file (little endian) :
+    header : magic, version, width, square width, square height, cell number, 1 if it holds solutions else 0
+    then one record per puzzle : the values of its cells, one byte per cell (0 meaning unknown),
+             then the values of the cells of its solution if the corpus holds solutions
+
+    python -m SudokuSolver.corpus puzzles.csv -o puzzles.sspc
+"""
+import argparse
+import mmap
+import os
+import struct
+from time import perf_counter
+from typing import BinaryIO, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from SudokuSolver.sudoku import Cell, GridSpec, Position
+
+MAGIC = b"SSPC"
+VERSION = 1
+HEADER = struct.Struct("<4sHHHHHB")
+FORMATS = ("lines", "csv", "sdk")
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+# The value of each byte of a text puzzle, INVALID if it can not be part of a puzzle
+INVALID = 255
+CHARACTER_VALUES = np.full(256, INVALID, dtype=np.uint8)
+CHARACTER_VALUES[ord(".")] = 0
+for _value, _character in enumerate(DIGITS):
+    CHARACTER_VALUES[ord(_character)] = CHARACTER_VALUES[ord(_character.lower())] = _value
+SEPARATORS = np.zeros(256, dtype=bool)
+SEPARATORS[[ord(","), ord(" "), ord("\t"), ord(";")]] = True
+
+
+class PuzzleCorpus:
+    """
+    Puzzles of the same dimensions, stored as a (puzzle number x cell number) array of values, 0 meaning unknown,
+    along with their solutions if known. The arrays may be views on a mapped corpus file
+    """
+
+    def __init__(self, puzzles: np.ndarray, grid_spec: GridSpec, solutions: Optional[np.ndarray] = None):
+        self.puzzles = puzzles
+        self.grid_spec = grid_spec
+        self.solutions = solutions
+        self.mmap: Optional[mmap.mmap] = None
+
+    def __len__(self):
+        return len(self.puzzles)
+
+    def __getitem__(self, index: int) -> np.ndarray:
+        """Returns the values of the cells of a puzzle"""
+        return self.puzzles[index]
+
+    def values(self, index: int) -> List[int]:
+        """Returns the values of the cells of a puzzle, as used by the exact solvers"""
+        return self.puzzles[index].tolist()
+
+    def given_cells(self, index: int) -> Set[Cell]:
+        """Returns the given cells of a puzzle, as used by Sudoku"""
+        width = self.grid_spec.width
+        return {
+            Cell(Position((cell % width, cell // width)), value)
+            for cell, value in enumerate(self.puzzles[index].tolist())
+            if value
+        }
+
+    def line(self, index: int) -> str:
+        """Returns a puzzle in the lines format"""
+        return "".join(DIGITS[value] if value else "." for value in self.puzzles[index].tolist())
+
+    def save(self, path: str):
+        with CorpusWriter(path, self.grid_spec, self.solutions is not None) as writer:
+            writer.append(self.puzzles, self.solutions)
+
+    @classmethod
+    def open(cls, path: str) -> "PuzzleCorpus":
+        """Maps a corpus file. Puzzles are only read when they are accessed"""
+        with open(path, "rb") as file:
+            header = file.read(HEADER.size)
+            if len(header) != HEADER.size:
+                raise ValueError(f"{path} is not a corpus file")
+            magic, version, width, square_width, square_height, cell_number, has_solutions = HEADER.unpack(header)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a corpus file")
+            if version != VERSION:
+                raise ValueError(f"Unsupported corpus file version {version}")
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        record_size = cell_number * (2 if has_solutions else 1)
+        # An interrupted writer may have left an incomplete record at the end of the file : it is ignored
+        records = np.frombuffer(
+            mapped, dtype=np.uint8, count=(len(mapped) - HEADER.size) // record_size * record_size, offset=HEADER.size
+        ).reshape(-1, record_size)
+        corpus = cls(
+            records[:, :cell_number],
+            GridSpec.get(width, square_width, square_height),
+            records[:, cell_number:] if has_solutions else None,
+        )
+        corpus.mmap = mapped
+        return corpus
+
+    def close(self):
+        """Releases the mapped file, if any"""
+        if self.mmap is not None:
+            # The views on the mapped file must be released before closing it
+            self.puzzles = self.solutions = None
+            self.mmap.close()
+            self.mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class CorpusWriter:
+    """
+    Appends puzzles to a new corpus file. Puzzles are given as arrays of values, one line per puzzle
+    """
+
+    def __init__(self, path: str, grid_spec: GridSpec, has_solutions: bool = False):
+        self.path = path
+        self.grid_spec = grid_spec
+        self.has_solutions = has_solutions
+        self.count = 0
+        self.file: BinaryIO = open(path, "wb")
+        self.file.write(
+            HEADER.pack(
+                MAGIC,
+                VERSION,
+                grid_spec.width,
+                grid_spec.square_width,
+                grid_spec.square_height,
+                grid_spec.cell_number,
+                has_solutions,
+            )
+        )
+
+    def append(self, puzzles: np.ndarray, solutions: Optional[np.ndarray] = None):
+        """Write puzzles, and their solutions if the corpus holds solutions (unknown ones being 0)"""
+        puzzles = np.asarray(puzzles, dtype=np.uint8).reshape(-1, self.grid_spec.cell_number)
+        if self.has_solutions:
+            if solutions is None:
+                solutions = np.zeros_like(puzzles)
+            puzzles = np.hstack((puzzles, np.asarray(solutions, dtype=np.uint8).reshape(puzzles.shape)))
+        self.file.write(np.ascontiguousarray(puzzles).tobytes())
+        self.count += len(puzzles)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def detect_format(path: str) -> str:
+    extension = os.path.splitext(path)[1].lower()
+    return {".sdk": "sdk", ".csv": "csv"}.get(extension, "lines")
+
+
+def map_file(path: str) -> Tuple[Optional[mmap.mmap], np.ndarray]:
+    """Returns the mapped file and a byte array on it. Empty files can not be mapped"""
+    with open(path, "rb") as file:
+        if not os.fstat(file.fileno()).st_size:
+            return None, np.zeros(0, dtype=np.uint8)
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    return mapped, np.frombuffer(mapped, dtype=np.uint8)
+
+
+def line_bounds(chunk: np.ndarray, final: bool) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Returns the starts and the ends (\\r and \\n excluded) of the complete lines of chunk,
+    and the size of the part of chunk they cover. If final, the last line does not need a new line character
+    """
+    ends = np.flatnonzero(chunk == ord("\n"))
+    covered = int(ends[-1]) + 1 if len(ends) else 0
+    if final and covered < len(chunk):
+        ends = np.append(ends, len(chunk))
+        covered = len(chunk)
+    starts = np.empty_like(ends)
+    starts[:1] = 0
+    starts[1:] = ends[:-1] + 1
+    ends = ends - ((ends > starts) & (chunk[np.maximum(ends - 1, 0)] == ord("\r")))
+    return starts, ends, covered
+
+
+def gather(chunk: np.ndarray, starts: np.ndarray, cell_number: int) -> np.ndarray:
+    """Returns the values of the cell_number characters following each start"""
+    return CHARACTER_VALUES[chunk[starts[:, np.newaxis] + np.arange(cell_number)]]
+
+
+def find_cell_number(data: np.ndarray) -> int:
+    """Returns the number of cells of the first puzzle of a lines or csv file. Raises ValueError if there is none"""
+    starts, ends, _ = line_bounds(data[: 1 << 16], True)
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        line = data[start:end]
+        invalid = np.flatnonzero((CHARACTER_VALUES[line] == INVALID))
+        length = int(invalid[0]) if len(invalid) else len(line)
+        width = int(round(length ** 0.5))
+        if (
+            width >= 4
+            and width * width == length
+            and (length == len(line) or SEPARATORS[line[length]])
+            and (CHARACTER_VALUES[line[:length]] <= width).all()
+        ):
+            return length
+    raise ValueError("No puzzle found")
+
+
+def iter_line_chunks(
+    data: np.ndarray, cell_number: int, chunk_size: int = 1 << 22, mapped: Optional[mmap.mmap] = None
+) -> Iterator[Tuple[np.ndarray, Optional[np.ndarray], int]]:
+    """
+    Parses a lines or csv file of puzzles of cell_number cells, chunk_size bytes at a time.
+    Yields the puzzles of each chunk, their solutions (None if the chunk has none, 0 for the unknown ones)
+    and the number of lines which are not puzzles.
+    If data is a view on mapped, the pages already parsed are released so that they do not stay in memory
+    """
+    width = int(round(cell_number ** 0.5))
+    position = 0
+    while position < len(data):
+        if mapped is not None and hasattr(mmap, "MADV_DONTNEED") and position >= mmap.PAGESIZE:
+            mapped.madvise(mmap.MADV_DONTNEED, 0, position // mmap.PAGESIZE * mmap.PAGESIZE)
+        chunk = data[position : position + chunk_size]
+        final = position + chunk_size >= len(data)
+        starts, ends, covered = line_bounds(chunk, final)
+        if not covered:
+            # A line longer than a chunk can not be a puzzle : skip it
+            next_line = np.flatnonzero(data[position + chunk_size :] == ord("\n"))
+            position = len(data) if not len(next_line) else position + chunk_size + int(next_line[0]) + 1
+            yield np.zeros((0, cell_number), dtype=np.uint8), None, 1
+            continue
+        position += covered
+
+        lengths = ends - starts
+        # The puzzle fills the line, or is followed by a separator
+        candidates = lengths >= cell_number
+        candidates[candidates] &= (lengths[candidates] == cell_number) | SEPARATORS[
+            chunk[np.minimum(starts[candidates] + cell_number, len(chunk) - 1)]
+        ]
+        # Blank lines are not counted as skipped
+        skipped = int(np.count_nonzero(~candidates & (lengths > 0)))
+        starts, lengths = starts[candidates], lengths[candidates]
+        puzzles = gather(chunk, starts, cell_number)
+        valid = (puzzles <= width).all(axis=1)
+        skipped += int(np.count_nonzero(~valid))
+        puzzles, starts, lengths = puzzles[valid], starts[valid], lengths[valid]
+
+        solutions = None
+        # The solutions of "puzzle,solution" lines
+        with_solution = lengths >= 2 * cell_number + 1
+        with_solution[with_solution] &= chunk[starts[with_solution] + cell_number] == ord(",")
+        if with_solution.any():
+            solutions = np.zeros_like(puzzles)
+            found = gather(chunk, starts[with_solution] + cell_number + 1, cell_number)
+            found[(found > width).any(axis=1)] = 0
+            solutions[with_solution] = found
+        yield puzzles, solutions, skipped
+
+
+def parse_sdk(data: np.ndarray) -> Tuple[np.ndarray, int]:
+    """
+    Parses the grids of a sdk file : consecutive lines of the same length n, n being the number of lines of a grid.
+    Returns the puzzles and the number of lines which are not part of a grid
+    """
+    grids, rows, skipped = [], [], 0
+    for raw_line in data.tobytes().decode("ascii", "replace").splitlines() + [""]:
+        line = raw_line.strip()
+        if line.startswith("#") or (line.startswith("[") and line.endswith("]")):
+            continue
+        values = CHARACTER_VALUES[np.frombuffer(line.encode(), dtype=np.uint8)]
+        if line and (INVALID in values or (rows and len(values) != len(rows[0]))):
+            skipped += 1
+            line, values = "", None
+        if line:
+            rows.append(values)
+        if rows and len(rows) == len(rows[0]):
+            grids.append(np.concatenate(rows))
+            rows = []
+        elif not line and rows:
+            skipped += len(rows)
+            rows = []
+    if not grids:
+        return np.zeros((0, 0), dtype=np.uint8), skipped
+    cell_number = len(grids[0])
+    puzzles = [grid for grid in grids if len(grid) == cell_number and (grid <= len(grid) ** 0.5).all()]
+    return np.array(puzzles, dtype=np.uint8), skipped + len(grids) - len(puzzles)
+
+
+def iter_chunks(
+    path: str, file_format: Optional[str] = None, chunk_size: int = 1 << 22
+) -> Iterator[Tuple[GridSpec, np.ndarray, Optional[np.ndarray], int]]:
+    """
+    Streams the puzzles of a text file. Yields the dimensions of the grids, then the puzzles, the solutions
+    and the number of skipped lines of each chunk
+    """
+    file_format = file_format or detect_format(path)
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown format {file_format}")
+    mapped, data = map_file(path)
+    chunks = None
+    try:
+        if file_format == "sdk":
+            puzzles, skipped = parse_sdk(data)
+            if not len(puzzles):
+                raise ValueError(f"No puzzle found in {path}")
+            yield GridSpec.get(int(round(puzzles.shape[1] ** 0.5))), puzzles, None, skipped
+            return
+        cell_number = find_cell_number(data)
+        grid_spec = GridSpec.get(int(round(cell_number ** 0.5)))
+        chunks = iter_line_chunks(data, cell_number, chunk_size, mapped)
+        for puzzles, solutions, skipped in chunks:
+            yield grid_spec, puzzles, solutions, skipped
+    finally:
+        # The views on the mapped file must be released before closing it
+        if chunks is not None:
+            chunks.close()
+        del data
+        if mapped is not None:
+            mapped.close()
+
+
+def count_lines(path: str) -> int:
+    """Returns an upper bound of the number of puzzles of a text file"""
+    mapped, data = map_file(path)
+    try:
+        chunk_size = 1 << 24
+        newlines = sum(
+            int(np.count_nonzero(data[start : start + chunk_size] == ord("\n")))
+            for start in range(0, len(data), chunk_size)
+        )
+        return newlines + 1
+    finally:
+        del data
+        if mapped is not None:
+            mapped.close()
+
+
+def import_puzzles(path: str, file_format: Optional[str] = None) -> Tuple[PuzzleCorpus, int]:
+    """
+    Reads the puzzles of a text file in memory. Returns the corpus and the number of skipped lines.
+    The corpus is filled in place, so that its memory is allocated once
+    """
+    capacity = count_lines(path)
+    puzzles = solutions = None
+    grid_spec, count, skipped = None, 0, 0
+    for grid_spec, chunk_puzzles, chunk_solutions, chunk_skipped in iter_chunks(path, file_format):
+        if puzzles is None:
+            puzzles = np.empty((capacity, grid_spec.cell_number), dtype=np.uint8)
+        if chunk_solutions is not None and solutions is None:
+            solutions = np.zeros_like(puzzles)
+        puzzles[count : count + len(chunk_puzzles)] = chunk_puzzles
+        if chunk_solutions is not None:
+            solutions[count : count + len(chunk_puzzles)] = chunk_solutions
+        count += len(chunk_puzzles)
+        skipped += chunk_skipped
+    if grid_spec is None:
+        raise ValueError(f"No puzzle found in {path}")
+    # Slicing does not copy : the unused end of the arrays is never touched, so it does not use memory
+    return PuzzleCorpus(puzzles[:count], grid_spec, None if solutions is None else solutions[:count]), skipped
+
+
+def import_to_file(path: str, output_path: str, file_format: Optional[str] = None) -> Tuple[int, int]:
+    """
+    Streams the puzzles of a text file to a corpus file. Returns the number of puzzles and of skipped lines.
+    The corpus holds solutions if the first chunk of the text file has some
+    """
+    writer, skipped = None, 0
+    try:
+        for grid_spec, puzzles, solutions, chunk_skipped in iter_chunks(path, file_format):
+            if writer is None:
+                writer = CorpusWriter(output_path, grid_spec, solutions is not None)
+            writer.append(puzzles, solutions)
+            skipped += chunk_skipped
+    finally:
+        if writer is not None:
+            writer.close()
+    return (writer.count if writer is not None else 0), skipped
+
+
+def main(arguments: Optional[List[str]] = None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Import puzzles from a text file into a corpus file")
+    parser.add_argument("input", help="text file of puzzles")
+    parser.add_argument("-o", "--output", required=True, help="corpus file to create")
+    parser.add_argument("-f", "--format", choices=FORMATS, help="format of the input. Guessed from its extension")
+    options = parser.parse_args(arguments)
+    start = perf_counter()
+    count, skipped = import_to_file(options.input, options.output, options.format)
+    print(f"{count} puzzles imported in {perf_counter() - start:.2f} seconds, {skipped} lines skipped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+This file contains exact solvers, used instead of the genetic algorithm engine when an answer is needed quickly
+"""
+from typing import Dict, List, Optional, Set, Tuple, Type
+
+import numpy as np
+
+from SudokuSolver.sudoku import Cell, GridSpec, Sudoku
+
+Solution = List[int]
+
+
+class BitmaskSolver:
+    """
+    Backtracking solver keeping the values used by each row, column and square as bitmasks
+    The bit n of a mask means the value n is used.
+    At each step, a value having a single possible cell in a unit (hidden single) is placed first,
+    otherwise the cell having the fewest candidates is filled (minimum remaining values ordering)
+    """
+
+    def __init__(self, grid_spec: GridSpec):
+        self.width = grid_spec.width
+        self.all_values = sum(1 << value for value in range(1, grid_spec.value_number + 1))
+        # Number of bits set in each mask, precomputed for the usual grid sizes since it is read at each search step
+        self.bit_counts = [bin(mask).count("1") for mask in range(self.all_values + 1)] if self.width <= 16 else None
+        self.units = grid_spec.units.tolist()
+        # The row, column and square of each cell, as indexes in the masks list
+        self.units_of = grid_spec.cell_units
+
+    def solve(self, values: List[int], limit: int = 1) -> List[Solution]:
+        """
+        Returns up to limit solutions of the grid values (one value per cell, 0 meaning unknown)
+        """
+        # The values used by each unit, in the order of the unit tables
+        used = [0] * len(self.units)
+        for index, value in enumerate(values):
+            if value:
+                bit = 1 << value
+                if any(used[unit] & bit for unit in self.units_of[index]):
+                    # The given values are not consistent
+                    return []
+                for unit in self.units_of[index]:
+                    used[unit] |= bit
+
+        grid = list(values)
+        empty_cells = [index for index, value in enumerate(values) if not value]
+        solutions: List[Solution] = []
+        units, units_of, all_values, bit_counts = self.units, self.units_of, self.all_values, self.bit_counts
+        candidates = [0] * len(values)
+
+        def choose(remaining: int) -> Optional[Tuple[int, int]]:
+            """
+            Returns the next cell to fill among the remaining first empty cells and its candidates,
+            after moving it right after them. None if the grid can not be solved anymore
+            """
+            # Compute the candidates of the empty cells and find the one having the fewest
+            best_position, best_count = 0, self.width + 1
+            for position in range(remaining):
+                index = empty_cells[position]
+                row, column, square = units_of[index]
+                cell_candidates = all_values & ~(used[row] | used[column] | used[square])
+                candidates[index] = cell_candidates
+                count = bit_counts[cell_candidates] if bit_counts else bin(cell_candidates).count("1")
+                if count < best_count:
+                    best_position, best_count = position, count
+                    if count <= 1:
+                        break
+            if not best_count:
+                return None
+            best_index = empty_cells[best_position]
+            best_candidates = candidates[best_index]
+
+            if best_count > 1:
+                # Look for a hidden single, and check every value still has a place in each unit
+                for unit_index, unit in enumerate(units):
+                    once, several = 0, 0
+                    for index in unit:
+                        if not grid[index]:
+                            several |= once & candidates[index]
+                            once |= candidates[index]
+                    if (once | used[unit_index]) != all_values:
+                        return None
+                    singles = once & ~several
+                    if singles:
+                        bit = singles & -singles
+                        best_index = next(index for index in unit if not grid[index] and candidates[index] & bit)
+                        best_position, best_candidates = empty_cells.index(best_index, 0, remaining), bit
+                        break
+
+            # Move the chosen cell at the end of the remaining cells
+            last = remaining - 1
+            empty_cells[best_position], empty_cells[last] = empty_cells[last], empty_cells[best_position]
+            return best_index, best_candidates
+
+        # The search is depth first, with an explicit stack so that big grids do not hit the recursion limit.
+        # Each frame holds a cell being filled, the candidates not tried yet and the bit of its current value
+        frames: List[List[int]] = []
+        remaining = len(empty_cells)
+        descend = True
+        while True:
+            if descend:
+                if not remaining:
+                    solutions.append(list(grid))
+                    if len(solutions) >= limit:
+                        break
+                else:
+                    chosen = choose(remaining)
+                    if chosen is not None:
+                        frames.append([chosen[0], chosen[1], 0])
+                        remaining -= 1
+            # Try the next candidate of the last cell chosen, backtracking from the cells having none left
+            descend = False
+            while frames:
+                frame = frames[-1]
+                index, cell_candidates, bit = frame
+                row, column, square = units_of[index]
+                if bit:
+                    # Remove the current value
+                    used[row] ^= bit
+                    used[column] ^= bit
+                    used[square] ^= bit
+                if cell_candidates:
+                    bit = cell_candidates & -cell_candidates
+                    frame[1], frame[2] = cell_candidates ^ bit, bit
+                    used[row] |= bit
+                    used[column] |= bit
+                    used[square] |= bit
+                    grid[index] = bit.bit_length() - 1
+                    descend = True
+                    break
+                grid[index] = 0
+                frames.pop()
+                remaining += 1
+            if not descend:
+                break
+        return solutions
+
+
+class DancingLinksSolver:
+    """
+    Solver using Knuth's Algorithm X on the exact cover formulation of the grid.
+    The links are stored as dicts of sets instead of doubly linked lists, which is faster in python
+    """
+
+    def __init__(self, grid_spec: GridSpec):
+        self.width = grid_spec.width
+        unit_of = grid_spec.cell_units
+
+        # Each choice (cell, value) covers 4 constraints : the cell is filled, and the value is used once
+        # in its row, its column and its square
+        self.choices: Dict[Tuple[int, int], List[Tuple]] = {
+            (index, value): [
+                ("cell", index),
+                ("row", unit_of[index][0], value),
+                ("column", unit_of[index][1], value),
+                ("square", unit_of[index][2], value),
+            ]
+            for index in range(grid_spec.cell_number)
+            for value in range(1, grid_spec.value_number + 1)
+        }
+        # The choices covering each constraint, copied at each solve
+        self.columns: Dict[Tuple, Set[Tuple[int, int]]] = {}
+        for choice, constraints in self.choices.items():
+            for constraint in constraints:
+                self.columns.setdefault(constraint, set()).add(choice)
+
+    def solve(self, values: List[int], limit: int = 1) -> List[Solution]:
+        """
+        Returns up to limit solutions of the grid values (one value per cell, 0 meaning unknown)
+        """
+        columns = {constraint: set(choices) for constraint, choices in self.columns.items()}
+
+        def select(choice: Tuple[int, int]) -> List[Set[Tuple[int, int]]]:
+            removed_columns = []
+            for constraint in self.choices[choice]:
+                for other_choice in columns[constraint]:
+                    for other_constraint in self.choices[other_choice]:
+                        if other_constraint != constraint:
+                            columns[other_constraint].remove(other_choice)
+                removed_columns.append(columns.pop(constraint))
+            return removed_columns
+
+        def deselect(choice: Tuple[int, int], removed_columns: List[Set[Tuple[int, int]]]):
+            for constraint in reversed(self.choices[choice]):
+                columns[constraint] = removed_columns.pop()
+                for other_choice in columns[constraint]:
+                    for other_constraint in self.choices[other_choice]:
+                        if other_constraint != constraint:
+                            columns[other_constraint].add(other_choice)
+
+        grid = list(values)
+        for index, value in enumerate(values):
+            if value:
+                if any(constraint not in columns for constraint in self.choices[(index, value)]):
+                    # The given values are not consistent
+                    return []
+                select((index, value))
+
+        solutions: List[Solution] = []
+
+        # The search is depth first, with an explicit stack so that big grids do not hit the recursion limit.
+        # Each frame holds the choices not tried yet for a constraint, and the current one with the columns it removed
+        frames: List[list] = []
+        descend = True
+        while True:
+            if descend:
+                if not columns:
+                    solutions.append(list(grid))
+                    if len(solutions) >= limit:
+                        break
+                else:
+                    # Cover the constraint having the fewest choices first
+                    constraint = min(columns, key=lambda key: len(columns[key]))
+                    frames.append([list(columns[constraint]), None])
+            # Try the next choice of the last constraint, backtracking from the constraints having none left
+            descend = False
+            while frames:
+                frame = frames[-1]
+                choices, current = frame
+                if current is not None:
+                    deselect(*current)
+                    frame[1] = None
+                if choices:
+                    choice = choices.pop()
+                    grid[choice[0]] = choice[1]
+                    frame[1] = choice, select(choice)
+                    descend = True
+                    break
+                frames.pop()
+            if not descend:
+                break
+        return solutions
+
+
+class ExactEngine:
+    """
+    Solves a grid exactly. It exposes the same interface as GeneticEngine so that both can be used in the same way
+    """
+
+    SOLVERS = {"bitmask": BitmaskSolver, "dancing_links": DancingLinksSolver}
+
+    def __init__(self, individual_class: Type[Sudoku], given_cells: Set[Cell], algorithm: str = "bitmask", **kwargs):
+        self.INDIVIDUAL_CLASS = individual_class
+        self.GIVEN_CELLS = given_cells
+        self.INDIVIDUAL_INIT_KWARGS = kwargs
+        if algorithm not in self.SOLVERS:
+            raise ValueError(f"Unknown exact algorithm {algorithm}")
+        self.ALGORITHM = algorithm
+
+    def run(self):
+        """
+        Returns the solution and stats in the same format as GeneticEngine.run
+        Raises ValueError if the grid has no solution
+        """
+        individual = self.INDIVIDUAL_CLASS(self.GIVEN_CELLS, **self.INDIVIDUAL_INIT_KWARGS)
+        solver = self.SOLVERS[self.ALGORITHM](individual.grid_spec)
+        values = np.where(individual.given_mask, individual.genome, 0)
+        solutions = solver.solve(values.tolist())
+        if not solutions:
+            raise ValueError("The grid has no solution")
+        individual.set_cells(individual.free_indexes, np.array(solutions[0], dtype=np.uint8)[individual.free_indexes])
+        score = individual.normalized_rate()
+        return [individual], [(score, score, score, 0)]
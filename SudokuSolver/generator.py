@@ -0,0 +1,205 @@
+"""
+This file contains the puzzle generator : it builds random puzzles having a single solution, in parallel,
+and streams them to a corpus file (see the corpus module) along with their solutions.
+
+A random solution is built by the exact solver from a random first row, then shuffled by a random symmetry.
+Its cells are removed in a random order, a removal being kept only if the puzzle still has a single solution,
+which the exact solver checks by stopping at the second solution it finds, until the puzzle has the requested
+number of given cells or no cell can be removed anymore.
+Puzzles are graded by the number of cells the presolver (see the presolve module) can not deduce.
+Puzzles below the requested grade are replaced, up to a maximum number of attempts per puzzle.
+
+    python -m SudokuSolver.generator -n 10000 --width 9 --givens 26 -o puzzles.sspc
+"""
+import argparse
+import os
+import random
+from collections import Counter
+from multiprocessing import Pool
+from time import perf_counter
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from SudokuSolver.batch import build_cells, get_exact_solver
+from SudokuSolver.corpus import CorpusWriter
+from SudokuSolver.presolve import presolve
+from SudokuSolver.solution_cache import Symmetry
+from SudokuSolver.sudoku import GridSpec
+
+
+class GenerationTask(NamedTuple):
+    width: int
+    given_number: int
+    puzzle_number: int
+    seed: int
+    # Puzzles whose grade is lower are discarded and replaced
+    min_grade: int = 0
+    # The maximum number of puzzles built to get one whose grade is at least min_grade
+    max_attempts: int = 1000
+
+
+def random_symmetry(grid_spec: GridSpec, rng: random.Random) -> Symmetry:
+    """Returns a random symmetry of the grids of grid_spec (see the solution_cache module)"""
+    width, square_width, square_height = grid_spec.width, grid_spec.square_width, grid_spec.square_height
+    row_order = [
+        band * square_height + row
+        for band in rng.sample(range(width // square_height), width // square_height)
+        for row in rng.sample(range(square_height), square_height)
+    ]
+    column_order = [
+        stack * square_width + column
+        for stack in rng.sample(range(width // square_width), width // square_width)
+        for column in rng.sample(range(square_width), square_width)
+    ]
+    digits = [0] + rng.sample(range(1, width + 1), width)
+    transposed = square_width == square_height and rng.random() < 0.5
+    return Symmetry(transposed, tuple(row_order), tuple(column_order), tuple(digits))
+
+
+def random_solution(grid_spec: GridSpec, rng: random.Random) -> List[int]:
+    """Returns a random solved grid"""
+    width = grid_spec.width
+    first_row = rng.sample(range(1, width + 1), width)
+    solution = get_exact_solver(width).solve(first_row + [0] * (grid_spec.cell_number - width))[0]
+    return random_symmetry(grid_spec, rng).apply(solution).tolist()
+
+
+def has_single_solution(values: List[int], width: int) -> bool:
+    return len(get_exact_solver(width).solve(values, limit=2)) == 1
+
+
+def remove_cells(solution: List[int], given_number: int, rng: random.Random) -> List[int]:
+    """
+    Returns a puzzle whose single solution is solution, having given_number given cells
+    or more if no other cell can be removed
+    """
+    width = int(round(len(solution) ** 0.5))
+    values = list(solution)
+    remaining = len(values)
+    for index in rng.sample(range(len(values)), len(values)):
+        if remaining <= given_number:
+            break
+        values[index] = 0
+        if has_single_solution(values, width):
+            remaining -= 1
+        else:
+            values[index] = solution[index]
+    return values
+
+
+def grade(values: List[int], grid_spec: GridSpec) -> int:
+    """Returns the number of cells of a puzzle the presolver can not deduce"""
+    return len(presolve(build_cells(values, grid_spec.width), grid_spec).candidates)
+
+
+def generate(task: GenerationTask) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Returns the puzzles of task, their solutions and their grades. Runs in a worker process
+    Raises ValueError if max_attempts puzzles in a row are below the requested grade
+    """
+    rng = random.Random(task.seed)
+    grid_spec = GridSpec.get(task.width)
+    puzzles, solutions, grades = [], [], []
+    attempts = 0
+    while len(puzzles) < task.puzzle_number:
+        if attempts == task.max_attempts:
+            raise ValueError(
+                f"No puzzle of grade {task.min_grade} or more found in {task.max_attempts} attempts "
+                f"for {task.width}x{task.width} grids with {task.given_number} given cells"
+            )
+        attempts += 1
+        solution = random_solution(grid_spec, rng)
+        puzzle = remove_cells(solution, task.given_number, rng)
+        puzzle_grade = grade(puzzle, grid_spec)
+        if puzzle_grade >= task.min_grade:
+            puzzles.append(puzzle)
+            solutions.append(solution)
+            grades.append(puzzle_grade)
+            attempts = 0
+    return (
+        np.array(puzzles, dtype=np.uint8).reshape(-1, grid_spec.cell_number),
+        np.array(solutions, dtype=np.uint8).reshape(-1, grid_spec.cell_number),
+        np.array(grades, dtype=np.int32),
+    )
+
+
+def generate_stream(
+    puzzle_number: int,
+    width: int = 9,
+    given_number: int = 0,
+    seed: int = 0,
+    max_workers: Optional[int] = None,
+    chunk_size: int = 16,
+    min_grade: int = 0,
+    max_attempts: int = 1000,
+) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Generates puzzle_number puzzles on a pool of worker processes, by chunks of chunk_size puzzles.
+    Yields the puzzles, solutions and grades of each chunk as soon as it is ready.
+    The puzzles only depend on seed, but with several workers their order does too
+    """
+    GridSpec.get(width)  # Fail fast on unsupported widths
+    tasks = (
+        GenerationTask(
+            width,
+            given_number,
+            min(chunk_size, puzzle_number - start),
+            seed * 1000003 + index,
+            min_grade,
+            max_attempts,
+        )
+        for index, start in enumerate(range(0, puzzle_number, chunk_size))
+    )
+    with Pool(max_workers or os.cpu_count() or 1) as pool:
+        yield from pool.imap_unordered(generate, tasks)
+
+
+def main(arguments: Optional[List[str]] = None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Generate puzzles having a single solution")
+    parser.add_argument("-n", "--number", type=int, default=1000, help="number of puzzles")
+    parser.add_argument("--width", type=int, default=9)
+    parser.add_argument("--givens", type=int, default=0, help="target number of given cells. 0 for minimal puzzles")
+    parser.add_argument("--min-grade", type=int, default=0, help="minimum number of cells the presolver can not fix")
+    parser.add_argument("--max-attempts", type=int, default=1000, help="puzzles built to reach --min-grade, per puzzle")
+    parser.add_argument("-o", "--output", required=True, help="corpus file to create")
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("-w", "--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("-c", "--chunk-size", type=int, default=16, help="number of puzzles generated per task")
+    options = parser.parse_args(arguments)
+
+    start = perf_counter()
+    given_counts, grades = Counter(), Counter()
+    with CorpusWriter(options.output, GridSpec.get(options.width), has_solutions=True) as writer:
+        try:
+            for puzzles, solutions, chunk_grades in generate_stream(
+                options.number,
+                options.width,
+                options.givens,
+                options.seed,
+                options.workers,
+                options.chunk_size,
+                options.min_grade,
+                options.max_attempts,
+            ):
+                writer.append(puzzles, solutions)
+                given_counts.update(np.count_nonzero(puzzles, axis=1).tolist())
+                grades.update(chunk_grades.tolist())
+                print(f"\r{writer.count} puzzles", end="")
+        except ValueError as error:
+            raise SystemExit(f"\n{error}")
+    print(f"\n{writer.count} puzzles generated in {perf_counter() - start:.2f} seconds")
+    # The number of puzzles having each number of given cells, then each grade
+    print(
+        "given cells :",
+        ", ".join(f"{puzzle_number} x {given_number}" for given_number, puzzle_number in sorted(given_counts.items())),
+    )
+    print(
+        "grades :",
+        ", ".join(f"{puzzle_number} x {puzzle_grade}" for puzzle_grade, puzzle_number in sorted(grades.items())),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,26 @@ This file contains the genetic algorithm engine
 """
 import os
 import pickle
+import random as random_module
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from random import choices, random
-from typing import Type, List, Union, Tuple, Set
+from random import random, sample
+from time import perf_counter_ns
+from typing import Type, List, Union, Tuple, Set, Optional, Hashable, Dict, NamedTuple, Callable
+
+import numpy as np
+
+from SudokuSolver.memetic import LocalSearch
+from SudokuSolver.observers import GenerationObserver, GenerationReport, StdoutObserver
+from SudokuSolver.profiles import Parameters, ParameterProfiles, default_profiles
+from SudokuSolver.restart import RestartActions, RestartPolicy
+from SudokuSolver.selection import PowerPressure, RouletteSelection, Selection
 
 Number = Union[float, int]
+# The best, mean and smallest scores of a generation and the index of its best individual,
+# followed by the time spent in each phase of the generation if the engine measures it (see PhaseTimers)
+GenerationStats = Union[Tuple[Number, Number, Number, int], Tuple[Number, Number, Number, int, Dict[str, int]]]
 
 
 class Individual:
@@ -55,6 +70,47 @@ class Individual:
             raise NotImplementedError(f"{type(self).__name__} must implement abstract maxi attribute")
         return (self._rate() - floor) * 100 / (maxi - floor)
 
+    @classmethod
+    def rate_population(cls, population: List["Individual"]) -> List[Number]:
+        """
+        Returns the normalized score of each individual of population, in the same order.
+        Override it if the individuals of a population can be scored all at once faster than one by one
+        """
+        return [individual.normalized_rate() for individual in population]
+
+    def genome_key(self) -> Optional[Hashable]:
+        """
+        Returns a hashable value identifying the genome of self. Individuals having the same key must have the same score.
+        It is used by the engine to avoid scoring the same genome twice. None means the score of self is never cached
+        """
+        return None
+
+    @classmethod
+    def difficulty(cls, *args, **kwargs) -> Optional[str]:
+        """
+        Returns the difficulty of the problem described by the arguments of the constructor,
+        used by the engine to find its tuned parameters (see the profiles module). None means it has no difficulty
+        """
+        return None
+
+    def local_search(self, budget: int):
+        """
+        Improves self in place by trying at most budget small changes, keeping only the ones improving its score.
+        Used by the optional local search stage of the engine (see the memetic module)
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def seed(cls, seed: Optional[int] = None):
+        """
+        Seeds the random module and the numpy random generator, used by the individuals and the selection operators.
+        None means seeding from the system entropy.
+        It is notably called at the start of each worker process so that they do not share the same random state.
+        Override it if the individuals use other random generators
+        """
+        random_module.seed(seed)
+        np.random.seed(seed)
+
     def mutate(self):
         """
         Describes how a mutation is supposed to modify the genome
@@ -117,6 +173,156 @@ class StatCollector:
         return self.total_sum / self.values_number
 
 
+class PhaseTimers:
+    """
+    Accumulates the time spent in each phase of the generations, in nanoseconds, and the number of times
+    each phase has been run
+    """
+
+    PHASES = ("mutation", "scoring", "local_search", "stats", "selection", "reproduction")
+
+    def __init__(self):
+        self.totals: Dict[str, int] = dict.fromkeys(self.PHASES, 0)
+        self.counts: Dict[str, int] = dict.fromkeys(self.PHASES, 0)
+
+    def record(self, phase: str, start: int) -> int:
+        """Add the time elapsed since start (a perf_counter_ns value) to phase. Returns the current time"""
+        now = perf_counter_ns()
+        self.totals[phase] += now - start
+        self.counts[phase] += 1
+        return now
+
+    def merge(self, other: "PhaseTimers"):
+        """Add the times and counts of other to self"""
+        for phase in self.PHASES:
+            self.totals[phase] += other.totals[phase]
+            self.counts[phase] += other.counts[phase]
+
+    def summary(self) -> Dict[str, Dict[str, Number]]:
+        """Returns the total time, count and mean time of each phase"""
+        return {
+            phase: {
+                "total_ns": self.totals[phase],
+                "count": self.counts[phase],
+                "mean_ns": self.totals[phase] / self.counts[phase] if self.counts[phase] else 0,
+            }
+            for phase in self.PHASES
+        }
+
+    def __str__(self):
+        grand_total = sum(self.totals.values()) or 1
+        return "\n".join(
+            f"{phase:<14}{self.totals[phase] / 1e9:>10.3f}s{self.totals[phase] * 100 / grand_total:>7.1f}%"
+            f"{self.counts[phase]:>10}"
+            for phase in self.PHASES
+        )
+
+
+class FitnessCache:
+    """
+    Remembers the normalized scores of the last max_size genomes scored by the engine, by their genome key.
+    The least recently used genomes are evicted first
+    """
+
+    def __init__(self, max_size: int = 100000):
+        self.max_size = max_size
+        self.scores: "OrderedDict[Hashable, Number]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0
+
+    def rate_population(self, individual_class: Type[Individual], population: List[Individual]) -> List[Number]:
+        """
+        Same as individual_class.rate_population, but only the genomes which are not in the cache are scored
+        """
+        keys = [individual.genome_key() for individual in population]
+        scores: List[Optional[Number]] = [None] * len(population)
+        # The indexes of the individuals to score, and the ones whose genome is scored through another individual
+        to_score: List[int] = []
+        duplicates: List[Tuple[int, Hashable]] = []
+        first_seen = {}
+        for index, key in enumerate(keys):
+            if key is None:
+                to_score.append(index)
+            elif key in self.scores:
+                self.scores.move_to_end(key)
+                scores[index] = self.scores[key]
+                self.hits += 1
+            elif key in first_seen:
+                duplicates.append((index, key))
+                self.hits += 1
+            else:
+                first_seen[key] = index
+                to_score.append(index)
+                self.misses += 1
+
+        for index, score in zip(to_score, individual_class.rate_population([population[i] for i in to_score])):
+            scores[index] = score
+            if keys[index] is not None:
+                self.scores[keys[index]] = score
+        for index, key in duplicates:
+            scores[index] = scores[first_seen[key]]
+
+        while len(self.scores) > self.max_size:
+            self.scores.popitem(last=False)
+        return scores
+
+    def __getstate__(self):
+        # The scores are not sent to worker processes, only the settings
+        return {"max_size": self.max_size, "scores": OrderedDict(), "hits": 0, "misses": 0}
+
+
+class PopulationState:
+    """
+    Holds a population and everything needed to resume its evolution.
+    It allows to evolve a population a few generations at a time, possibly in another process
+    """
+
+    def __init__(self, population: Population):
+        self.population = population
+        self.best_individual: Optional[Individual] = None
+        self.all_time_best_score: Optional[Number] = None
+
+        # These variables are used to detect if the population is stuck
+        self.no_progress_count = 0
+        self.generation_count = 0
+
+        # The best individual and the score stats of each generation
+        self.best_individuals: List[Individual] = []
+        self.score_stats: List[GenerationStats] = []
+
+        # Why the population stopped evolving, None if it can keep evolving
+        self.exit_reason: Optional[int] = None
+        # Why the population has been considered stuck, if it is blocked
+        self.stall_reason: Optional[str] = None
+        # The number of hypermutation bursts the population received (see RestartPolicy)
+        self.hypermutation_count = 0
+
+        # The time spent in each phase in total, if the engine measures it
+        self.phase_timers = PhaseTimers()
+
+        # The counts of the local search run on the population in a worker process, if the engine has one
+        self.local_search: Optional[LocalSearch] = None
+
+    def ranking(self, individual_class: Type[Individual]) -> List[int]:
+        """Returns the indexes of the individuals of the population, from the best one to the worst one"""
+        scores = individual_class.rate_population(self.population)
+        return sorted(range(len(self.population)), key=scores.__getitem__, reverse=True)
+
+    def receive(self, migrants: List[Individual], ranking: List[int]):
+        """
+        Replace the worst individuals of the population by migrants.
+        The best individual of the population is never replaced
+        """
+        worst_indexes = [index for index in reversed(ranking) if self.population[index] is not self.best_individual]
+        for index, migrant in zip(worst_indexes, migrants):
+            self.population[index] = migrant
+
+
 class ExitReasons:
     """
     Enum used to store the possible reasons why a population has stopped evolving.
@@ -126,6 +332,64 @@ class ExitReasons:
     KEYBOARD_INTERRUPT = 0
     SUCCESS = 1
     BLOCKED = 2
+    # The maximum number of generations allowed has been reached
+    GENERATION_LIMIT = 3
+    # Used by exact engines when the problem has no solution
+    NO_SOLUTION = 4
+    # Used by the solving service when the time allowed to solve the problem is over, or when the request was cancelled
+    DEADLINE = 5
+    CANCELLED = 6
+    # Used by the portfolio when the process running a strategy died without giving its result
+    CRASHED = 7
+
+    @staticmethod
+    def name(exit_reason: Optional[int]) -> str:
+        """Returns the name of exit_reason, to display it"""
+        for name, value in vars(ExitReasons).items():
+            if name.isupper() and value == exit_reason:
+                return name
+        return str(exit_reason)
+
+
+class RunOutcome(NamedTuple):
+    """The result of GeneticEngine.run_until"""
+
+    # The last population evolved, which is a new one if the run stopped right after a restart
+    state: PopulationState
+    # The best individual of the last generation run. None if no generation has been run
+    best_individual: Optional[Individual]
+    # The number of generations run, restarts included
+    generations: int
+    exit_reason: int
+
+
+class MigrationTopologies:
+    """
+    Enum used to store the ways the islands of the island model can exchange individuals
+    """
+
+    # Each island sends its best individuals to the next one
+    RING = "ring"
+    # Each island sends its best individuals to all the other ones
+    FULLY_CONNECTED = "fully_connected"
+    # Each island sends its best individuals to another island chosen at random at each migration
+    RANDOM = "random"
+
+    @staticmethod
+    def sources(topology: str, island_number: int) -> List[List[int]]:
+        """Returns, for each island, the islands it receives individuals from"""
+        if island_number < 2:
+            return [[] for _ in range(island_number)]
+        if topology == MigrationTopologies.RING:
+            return [[(index - 1) % island_number] for index in range(island_number)]
+        if topology == MigrationTopologies.FULLY_CONNECTED:
+            return [[source for source in range(island_number) if source != index] for index in range(island_number)]
+        if topology == MigrationTopologies.RANDOM:
+            return [
+                sample([source for source in range(island_number) if source != index], 1)
+                for index in range(island_number)
+            ]
+        raise ValueError(f"Unknown migration topology {topology}")
 
 
 class GeneticEngine:
@@ -134,66 +398,136 @@ class GeneticEngine:
     """
 
     def __init__(
-        self, individual_class: Type[Individual], population_size, *individual_init_args, **individual_init_kwargs
+        self,
+        individual_class: Type[Individual],
+        population_size: Optional[int],
+        *individual_init_args,
+        fitness_cache_size: Optional[int] = None,
+        selection: Optional[Selection] = None,
+        observers: Optional[List[GenerationObserver]] = None,
+        phase_timing: bool = False,
+        restart_policy: Optional[RestartPolicy] = None,
+        local_search: Optional[LocalSearch] = None,
+        parameters: Optional[Parameters] = None,
+        profiles: Optional[ParameterProfiles] = None,
+        **individual_init_kwargs,
     ):
 
         self.INDIVIDUAL_CLASS = individual_class
-        self.POPULATION_SIZE = population_size
         self.INDIVIDUAL_INIT_ARGS = individual_init_args
         self.INDIVIDUAL_INIT_KWARGS = individual_init_kwargs
+        # The tuned parameters of the problem : parameters if given, otherwise the ones of its difficulty in profiles,
+        # or in the profiles file given by the SUDOKUSOLVER_PROFILES environment variable. None if there are none.
+        # A population_size or a selection given explicitly takes precedence over them
+        if parameters is None:
+            profiles = profiles if profiles is not None else default_profiles()
+            if profiles is not None:
+                parameters = profiles.get(individual_class.difficulty(*individual_init_args, **individual_init_kwargs))
+        self.parameters = parameters
+        self.POPULATION_SIZE = population_size or (parameters or Parameters()).population_size
+        # Scores of the genomes already seen, keyed by Individual.genome_key. A size of 0 or None disables it.
+        # It is worth enabling when _rate is costly : Sudoku scores are updated incrementally and barely benefit from it
+        self.fitness_cache = FitnessCache(fitness_cache_size) if fitness_cache_size else None
+        # How the parents of the next generation are chosen. Defaults to a roulette on score ** 10
+        if selection is None and parameters is not None:
+            selection = RouletteSelection(PowerPressure(parameters.pressure_exponent))
+        self.selection = selection or RouletteSelection()
+        # The observers receiving the stats of each generation (see the observers module)
+        # By default, the advancement of the algorithm is shown on stdout. An empty list disables all output
+        self.observers: List[GenerationObserver] = [StdoutObserver()] if observers is None else list(observers)
+        # If enabled, the time spent in each phase of the generations is measured.
+        # phase_timers holds the totals of every population run by self
+        self.PHASE_TIMING = phase_timing
+        self.phase_timers = PhaseTimers()
+        # When a population is stuck and what to do with it. Defaults to a full restart after half of the generations
+        # without progress. restarts holds the action taken and the reason of each restart (see RestartActions)
+        self.restart_policy = restart_policy or RestartPolicy()
+        self.restarts: List[Tuple[str, str]] = []
+        # If given, the best individuals of each generation are improved by a local search after being scored.
+        # It also counts the improvements it made, the ones made in the worker processes of the island model included
+        self.local_search = local_search
+
+    def rate_population(self, population: Population) -> List[Number]:
+        """Returns the normalized score of each individual of population, using the fitness cache if enabled"""
+        if self.fitness_cache is None:
+            return self.INDIVIDUAL_CLASS.rate_population(population)
+        return self.fitness_cache.rate_population(self.INDIVIDUAL_CLASS, population)
+
+    def new_individual(self) -> Individual:
+        """
+        Instantiate an individual according to the arguments give to self.__init__, with the tuned probabilities if any
+        Its children inherit them
+        """
+        # noinspection PyArgumentList
+        individual = self.INDIVIDUAL_CLASS(*self.INDIVIDUAL_INIT_ARGS, **self.INDIVIDUAL_INIT_KWARGS)
+        if self.parameters is not None:
+            if individual.mutation_probability != self.parameters.mutation_probability:
+                individual.mutation_probability = self.parameters.mutation_probability
+            if individual.mating_probability != self.parameters.mating_probability:
+                individual.mating_probability = self.parameters.mating_probability
+        return individual
 
     def init_population(self) -> Population:
         """
         Instantiate a list of individual according to the arguments give to self.__init__
         """
-        # noinspection PyArgumentList
-        return [
-            self.INDIVIDUAL_CLASS(*self.INDIVIDUAL_INIT_ARGS, **self.INDIVIDUAL_INIT_KWARGS)
-            for _ in range(self.POPULATION_SIZE)
-        ]
+        return [self.new_individual() for _ in range(self.POPULATION_SIZE)]
 
-    def run_generation(self, population: Population, do_not_mutate: Set[Individual]):
+    def run_generation(
+        self, population: Population, do_not_mutate: Set[Individual], timers: Optional[PhaseTimers] = None
+    ):
         """
         Performs all the actions needed for a generation
         Collect statistics about this generation
         do_not_mutate is a set of individuals who should not be mutated.
         This feature is notably used to prevent mutation or sexual reproduction on the best individual
+        The time spent in each phase is added to timers if given
         """
+        start = perf_counter_ns() if timers is not None else 0
 
         score_stats = StatCollector()
         mutation_probability_stats = StatCollector()
         mating_probability_stats = StatCollector()
 
-        scores = []
-        for index, individual in enumerate(population):
+        # Mutation
+        for individual in population:
             assert individual is not None
-
-            # Mutation
             if individual not in do_not_mutate:
                 individual.mutate()
+        if timers is not None:
+            start = timers.record("mutation", start)
 
-            score = individual.normalized_rate()
-            scores.append(score)
+        # Scoring is done for the whole population at once
+        # The elite, the clones and the individuals left unchanged by mutate are usually found in the fitness cache
+        scores = self.rate_population(population)
+        if timers is not None:
+            start = timers.record("scoring", start)
 
+        if self.local_search is not None:
+            self.local_search.apply(population, scores)
+            if timers is not None:
+                start = timers.record("local_search", start)
+
+        for index, (individual, score) in enumerate(zip(population, scores)):
             # Collect stats
             score_stats.collect(score, individual, index)
             mutation_probability_stats.collect(individual.mutation_probability, individual, index)
             mating_probability_stats.collect(individual.mating_probability, individual, index)
-
-        # An individual with a score of 10 has 10 times more chances to reproduce
-        # and have an offspring in the next generation
-        # However this difference can be accentuated by performing an arbitrary operation on the scores.
-        # Empirical evidence showed that performing score ** 10 provided better results while trying to solve a sudoku.
-        # Later version of this engine may provide a way of specifying this operation as a hyper-parameter
-        # instead of hard-coding it
-        biased_scores = [score ** 10 for score in scores]
-        for i, (father, mother) in enumerate(
-            zip(
-                choices(population, biased_scores, k=self.POPULATION_SIZE - len(do_not_mutate)),
-                choices(population, biased_scores, k=self.POPULATION_SIZE - len(do_not_mutate)),
-            )
-        ):
-            population[i] = father.reproduce(mother)
+        if timers is not None:
+            start = timers.record("stats", start)
+
+        # The parents of the whole next generation are selected at once, according to their scores.
+        # The default selection gives individuals a probability proportional to score ** 10
+        # (see the selection module for other operators and other selection pressures)
+        fathers, mothers = self.selection.select_parents(scores, self.POPULATION_SIZE - len(do_not_mutate))
+        if timers is not None:
+            start = timers.record("selection", start)
+        population[:] = [
+            population[father].reproduce(population[mother])
+            for father, mother in zip(fathers.tolist(), mothers.tolist())
+        ]
+        if timers is not None:
+            timers.record("reproduction", start)
 
         # In every case, add the individual not to mutate to the population
         population.extend(do_not_mutate)
@@ -201,106 +535,312 @@ class GeneticEngine:
         # Returns the collected stats
         return score_stats, mutation_probability_stats, mating_probability_stats
 
-    def run_population(self, success_score=100):
+    def evolve(
+        self,
+        state: "PopulationState",
+        generation_number: Optional[int] = None,
+        success_score=100,
+        verbose=True,
+    ):
         """
-        Evolve a population until it succeeds or it is stuck in a local optimum
-        Also collect stats about the population
+        Evolve the population of state until it succeeds, it is stuck in a local optimum
+        or generation_number generations have been run (if given)
+        Also collect stats about the population into state, and send them to the observers if verbose
         """
-        population = self.init_population()
-
-        # Variables used to collect statistics
-        population_score_stats = []
-        population_best_individuals = []
-        best_individual = None
-        all_time_best_score = None
-
-        # These variables are used to detect if the population is stuck
-        no_progress_count = 0
-        generation_count = 0
-
+        last_generation = None if generation_number is None else state.generation_count + generation_number
         keep_running = True
-        while keep_running:
+        while keep_running and state.generation_count != last_generation:
 
             try:
                 # Run one generation, do not mutate the best individual
                 # Retrieve stats to later display them to the user
+                timers = PhaseTimers() if self.PHASE_TIMING else None
                 score_stats, mutation_probability_stats, mating_probability_stats = self.run_generation(
-                    population, do_not_mutate={best_individual} if best_individual else set()
-                )
-                best_individual = score_stats.greatest_item
-
-                # Show to the user the advancement of the algorithm
-                text = (
-                    f"{format(score_stats.greatest, '<4.2f')}\t"
-                    f"{format(score_stats.mean, '<4.2f')}\t"
-                    f"{format(score_stats.smallest, '<4.2f')}\t"
-                    f"{format(mutation_probability_stats.mean, '<4.4f')}\t"
-                    f"{format(mating_probability_stats.mean, '<4.4f')}\t"
-                    f"{generation_count}"
+                    state.population, {state.best_individual} if state.best_individual else set(), timers
                 )
-                print(f"\r{text}", end="")
+                state.best_individual = score_stats.greatest_item
+                generation_stats = (score_stats.greatest, score_stats.mean, score_stats.smallest, score_stats.greatest_id)
+                if timers is not None:
+                    generation_stats += (timers.totals,)
+                    state.phase_timers.merge(timers)
 
                 # Collect stats and the individuals having the solution to the problem (best_individuals)
-                population_score_stats.append(
-                    (score_stats.greatest, score_stats.mean, score_stats.smallest, score_stats.greatest_id)
-                )
-                population_best_individuals.append(best_individual)
+                state.score_stats.append(generation_stats)
+                state.best_individuals.append(state.best_individual)
 
                 # Check if we are stuck
-                if all_time_best_score is None or score_stats.greatest > all_time_best_score:
+                if state.all_time_best_score is None or score_stats.greatest > state.all_time_best_score:
                     # We just made progress
-                    all_time_best_score = score_stats.greatest
-                    no_progress_count = 0
-                    if all_time_best_score >= success_score:
+                    state.all_time_best_score = score_stats.greatest
+                    state.no_progress_count = 0
+                    if state.all_time_best_score >= success_score:
                         # Check if we achieved the best score possible
                         # If yes, stop evolving
                         keep_running = False
-                        exit_reason = ExitReasons.SUCCESS
+                        state.exit_reason = ExitReasons.SUCCESS
                 else:
                     # No progress has been made
-                    no_progress_count += 1
-                    if generation_count > 20 and no_progress_count >= generation_count // 2:
-                        # If no progress has been made for half of the time,
-                        # stop evolving since we are probably stuck in a local optimum
+                    state.no_progress_count += 1
+                    stall_reason = self.restart_policy.stall_reason(state)
+                    if stall_reason is not None:
+                        # Stop evolving since we are probably stuck in a local optimum
                         keep_running = False
-                        exit_reason = ExitReasons.BLOCKED
-
-                generation_count += 1
+                        state.exit_reason = ExitReasons.BLOCKED
+                        state.stall_reason = stall_reason
+
+                if verbose and self.observers:
+                    report = GenerationReport(
+                        state.generation_count,
+                        score_stats.greatest,
+                        score_stats.mean,
+                        score_stats.smallest,
+                        score_stats.greatest_id,
+                        mutation_probability_stats.mean,
+                        mating_probability_stats.mean,
+                        state.exit_reason,
+                        state.best_individual,
+                        None if timers is None else timers.totals,
+                    )
+                    for observer in self.observers:
+                        observer.notify(report)
+
+                state.generation_count += 1
 
             except KeyboardInterrupt:
                 # Gracefully handle ctrl+c
                 keep_running = False
-                exit_reason = ExitReasons.KEYBOARD_INTERRUPT
+                state.exit_reason = ExitReasons.KEYBOARD_INTERRUPT
+
+        return state
+
+    def run_population(self, success_score=100):
+        """
+        Evolve a population until it succeeds or it is stuck in a local optimum
+        Also collect stats about the population
+        """
+        state = self.evolve(PopulationState(self.init_population()), success_score=success_score)
+        self.phase_timers.merge(state.phase_timers)
 
         # Returns the best individual of each generation, stats and the reason why we stopped evolving
-        # noinspection PyUnboundLocalVariable
-        return population_best_individuals, population_score_stats, exit_reason
+        return state.best_individuals, state.score_stats, state.exit_reason
+
+    def restart(self, state: PopulationState) -> PopulationState:
+        """
+        Returns the state to evolve instead of the stuck state, according to the restart policy.
+        It is either state itself after a hypermutation burst or a new population
+        """
+        action = self.restart_policy.action(state)
+        self.restarts.append((action, state.stall_reason))
+
+        if action == RestartActions.HYPERMUTATION:
+            for individual in state.population:
+                if individual is not state.best_individual:
+                    for _ in range(self.restart_policy.hypermutation_strength):
+                        individual.mutate()
+            state.hypermutation_count += 1
+            state.no_progress_count = 0
+            state.exit_reason = state.stall_reason = None
+            return state
+
+        survivors = []
+        if action == RestartActions.PARTIAL_RESTART:
+            ranking = state.ranking(self.INDIVIDUAL_CLASS)
+            survivors = [state.population[index].clone() for index in ranking[: self.restart_policy.keep_best]]
+        return PopulationState(
+            survivors + [self.new_individual() for _ in range(self.POPULATION_SIZE - len(survivors))]
+        )
+
+    def run_until(
+        self,
+        max_generations: Optional[int] = None,
+        should_stop: Optional[Callable[[], Optional[int]]] = None,
+        slice_generations: int = 10,
+        success_score=100,
+        verbose=False,
+    ) -> RunOutcome:
+        """
+        Evolve a new population until it succeeds or max_generations generations have been run (if given),
+        restarting it according to the restart policy when it is stuck.
+        should_stop, if given, is called every slice_generations generations : the run stops as soon as it returns
+        an exit reason instead of None
+        """
+        state = PopulationState(self.init_population())
+        best_individual = None
+        generations = 0
+        while True:
+            exit_reason = None if should_stop is None else should_stop()
+            if exit_reason is not None:
+                break
+            if generations == max_generations:
+                exit_reason = ExitReasons.GENERATION_LIMIT
+                break
+            generation_number = None if should_stop is None else slice_generations
+            if max_generations is not None:
+                generation_number = min(generation_number or max_generations, max_generations - generations)
+
+            # Evolve the population
+            generation_count = state.generation_count
+            state = self.evolve(state, generation_number, success_score, verbose)
+            generations += state.generation_count - generation_count
+            best_individual = state.best_individual or best_individual
+            self.phase_timers.merge(state.phase_timers)
+            state.phase_timers = PhaseTimers()
+            if state.exit_reason == ExitReasons.BLOCKED:
+                # Restart it according to the restart policy and retry, unless it was its last generation
+                if generations != max_generations:
+                    state = self.restart(state)
+            elif state.exit_reason is not None:
+                # Either user exit or success
+                exit_reason = state.exit_reason
+                break
+        return RunOutcome(state, best_individual, generations, exit_reason)
 
     def run(self):
         """
         Entry point of the genetic algorithm
+        Returns the best individual and the score stats of each generation of the last population,
+        the stats including the phase times if they are measured (see GenerationStats)
         """
-        # Display the headers to improve the readability of later logs
-        print("max ", "avg ", "min ", "mut-pr", "mat-pr", "g-nbr", sep="\t")
-        keep_running = True
-        best_individuals = []
-        population_stats = []
-
-        while keep_running:
-            # Evolve a population
-            best_individuals, population_stats, exit_reason = self.run_population()
-            if exit_reason != ExitReasons.BLOCKED:
-                # If it stopped evolving and it is not blocked (either user exit or success), quit
-                keep_running = False
-            # Otherwise, build a new population and retry
-        print("\n", end="")
+        state = self.run_until(verbose=True).state
+        for observer in self.observers:
+            observer.close()
 
         # Returns solutions and stats
-        return best_individuals, population_stats
+        return state.best_individuals, state.score_stats
 
-    def save_stats_to_file(self, data: List[List[Tuple[Number, Number, Number]]], export_type: str) -> str:
+    def evolve_island(self, state: "PopulationState", generation_number: int, success_score=100):
         """
-        Utils method to save engine stats to file for later usage (in a nice graphical report by example)
+        Evolve an island of the island model for generation_number generations.
+        Runs in a worker process, without displaying anything.
+        The local search of the island is counted apart, and sent back with state to be merged by run_islands
+        """
+        local_search = self.local_search
+        if local_search is not None:
+            self.local_search = state.local_search = LocalSearch(local_search.elite_number, local_search.budget)
+        try:
+            return self.evolve(state, generation_number, success_score, verbose=False)
+        finally:
+            self.local_search = local_search
+
+    def run_islands(
+        self,
+        island_number: int,
+        migration_interval: int = 10,
+        migrant_number: int = 5,
+        topology: str = MigrationTopologies.RING,
+        max_workers: Optional[int] = None,
+        success_score=100,
+    ):
+        """
+        Entry point of the island model.
+        island_number populations evolve at the same time in a process pool.
+        Every migration_interval generations, each island sends copies of its migrant_number best individuals
+        to the islands given by topology, where they replace the worst individuals.
+        A stuck island is restarted from a new population and keeps exchanging individuals with the others.
+        Stops as soon as one island succeeds.
+        Returns the solutions and stats of the best island, and a summary of each island.
+        Its restarts only count the new populations, the hypermutation bursts being counted apart
+        """
+        # Fail fast if the topology does not exist
+        MigrationTopologies.sources(topology, island_number)
+        states = [PopulationState(self.init_population()) for _ in range(island_number)]
+        islands_best_individuals: List[List[Individual]] = [[] for _ in range(island_number)]
+        islands_stats = [
+            {
+                "score_stats": [],
+                "generations": 0,
+                "restarts": 0,
+                "hypermutations": 0,
+                "best_score": None,
+                "exit_reason": None,
+                "phase_timers": PhaseTimers(),
+            }
+            for _ in range(island_number)
+        ]
+
+        generation_count = 0
+        winner = None
+        with ProcessPoolExecutor(
+            max_workers=max_workers or min(island_number, os.cpu_count() or 1),
+            initializer=self.INDIVIDUAL_CLASS.seed,
+        ) as executor:
+            while winner is None:
+                try:
+                    # Each island runs migration_interval generations in a worker process
+                    states = list(
+                        executor.map(
+                            self.evolve_island,
+                            states,
+                            [migration_interval] * island_number,
+                            [success_score] * island_number,
+                        )
+                    )
+                except KeyboardInterrupt:
+                    # Gracefully handle ctrl+c, keeping the states of the last migration
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    break
+                generation_count += migration_interval
+
+                # Move the stats collected by the workers to the main process
+                # so that they are not sent back and forth between processes
+                for index, state in enumerate(states):
+                    island_stats = islands_stats[index]
+                    island_stats["score_stats"].extend(state.score_stats)
+                    island_stats["generations"] += len(state.score_stats)
+                    if island_stats["best_score"] is None or state.all_time_best_score > island_stats["best_score"]:
+                        island_stats["best_score"] = state.all_time_best_score
+                    island_stats["exit_reason"] = state.exit_reason
+                    islands_best_individuals[index].extend(state.best_individuals)
+                    island_stats["phase_timers"].merge(state.phase_timers)
+                    self.phase_timers.merge(state.phase_timers)
+                    state.score_stats, state.best_individuals = [], []
+                    state.phase_timers = PhaseTimers()
+                    if state.local_search is not None:
+                        self.local_search.merge(state.local_search)
+                        state.local_search = None
+                    if state.exit_reason in (ExitReasons.SUCCESS, ExitReasons.KEYBOARD_INTERRUPT) and winner is None:
+                        winner = index
+
+                # Send the advancement of the algorithm to the observers
+                for observer in self.observers:
+                    observer.notify_islands(generation_count, [state.all_time_best_score for state in states])
+
+                if winner is None:
+                    # Send the best individuals of each island to its neighbours
+                    rankings = [state.ranking(self.INDIVIDUAL_CLASS) for state in states]
+                    emigrants = [
+                        [state.population[i].clone() for i in ranking[:migrant_number]]
+                        for state, ranking in zip(states, rankings)
+                    ]
+                    sources = MigrationTopologies.sources(topology, island_number)
+                    for state, ranking, island_sources in zip(states, rankings, sources):
+                        state.receive([migrant for source in island_sources for migrant in emigrants[source]], ranking)
+
+                    # Restart the stuck islands according to the restart policy, as self.run does
+                    for index, state in enumerate(states):
+                        if state.exit_reason == ExitReasons.BLOCKED:
+                            states[index] = self.restart(state)
+                            if states[index] is state:
+                                islands_stats[index]["hypermutations"] += 1
+                            else:
+                                islands_best_individuals[index] = []
+                                islands_stats[index]["restarts"] += 1
+        for observer in self.observers:
+            observer.close()
+
+        if winner is None:
+            winner = max(range(island_number), key=lambda index: islands_stats[index]["best_score"] or 0)
+        # Returns the solutions and stats of the best island, starting from its last restart
+        winner_score_stats = islands_stats[winner]["score_stats"]
+        return (
+            islands_best_individuals[winner],
+            winner_score_stats[len(winner_score_stats) - len(islands_best_individuals[winner]) :],
+            islands_stats,
+        )
+
+    def data_file_path(self, export_type: str) -> str:
+        """
+        Returns a new file path in the ./data directory, named after export_type, the individual class and the date
         """
         directory_name = "data"
 
@@ -311,10 +851,17 @@ class GeneticEngine:
             raise RuntimeError("./data is not a directory")
 
         # Compute a nice file name
-        file_path = os.path.join(
+        return os.path.join(
             directory_name, f"{export_type}_{self.INDIVIDUAL_CLASS.__name__.lower()}_{datetime.now()}".replace(" ", "_")
         )
 
+    def save_stats_to_file(self, data: List[GenerationStats], export_type: str) -> str:
+        """
+        Utils method to save engine stats to file for later usage (in a nice graphical report by example)
+        The stats returned by run hold the phase times of each generation if they are measured
+        """
+        file_path = self.data_file_path(export_type)
+
         with open(file_path, "wb") as f:
             pickle.dump(data, f)
 
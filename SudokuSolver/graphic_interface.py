@@ -2,13 +2,13 @@
 This page is used to configure the program GUI
 """
 
-import pickle
 import tkinter as tk
 
 import matplotlib.pyplot as plt
+import numpy as np
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
-from SudokuSolver.grids import small_6x6_112
+from SudokuSolver.runlog import RunLog
 
 
 class Frame(tk.Frame):
@@ -21,6 +21,7 @@ class Frame(tk.Frame):
         self.individual = individual
         self.individual_cursor = tk.IntVar(individual_cursor)
         self.generation_cursor = tk.IntVar(generation_cursor)
+        self.population_cursor = tk.IntVar(0)
         self.given_cells = given_cells
 
         self.mean_score = tk.IntVar(0)
@@ -55,6 +56,8 @@ class Sodoku(Frame):
     y_separator = 3
 
     def init_ui(self, sep_index=2, **kwargs):
+        # The label of each cell, by coordinates. They are created once and updated when the individual changes
+        self.labels = {}
         self.x_separator = sep_index
         self.y_separator = sep_index if sep_index % 3 == 0 else sep_index + 1
 
@@ -78,7 +81,12 @@ class Sodoku(Frame):
         """
         Method used to place the cells predicted by the algorithm
         """
-        cell_label = tk.Label(self, text=cell_value, width=2, borderwidth=2, relief='groove', font=font)
+        if (row, column) in self.labels:
+            self.labels[row, column].configure(text=cell_value)
+            return
+        cell_label = self.labels[row, column] = tk.Label(
+            self, text=cell_value, width=2, borderwidth=2, relief='groove', font=font
+        )
         cell_label.grid(
             row=row, column=column,
             pady=(4 if row % self.x_separator == 0 and row else 1, 0),
@@ -92,6 +100,11 @@ class Cursor(Frame):
     """
 
     def init_ui(self, next_gen, previous_gen, **kwargs):
+        frame = tk.Frame(self)
+        tk.Label(frame, text='Population', font=('Helvetica', 14)).pack()
+        tk.Label(frame, textvariable=self.population_cursor, font=('Helvetica', 17)).pack()
+        frame.pack(padx=30, side=tk.LEFT)
+
         frame = tk.Frame(self)
         tk.Label(frame, text='Génération', font=('Helvetica', 14)).pack()
         tk.Label(frame, textvariable=self.generation_cursor, font=('Helvetica', 17)).pack()
@@ -132,36 +145,70 @@ class Score(Frame):
         frame.pack(pady=5)
 
 
+def downsample(values, bucket_number):
+    """
+    Returns the x and y of at most 2 * bucket_number points drawing the same envelope as values :
+    the smallest and the largest value of each bucket of consecutive generations, in the order they appear
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) <= 2 * bucket_number:
+        return np.arange(len(values)), values
+    bucket_size = -(-len(values) // bucket_number)
+    row_number = -(-len(values) // bucket_size)
+    buckets = np.full(row_number * bucket_size, np.nan)
+    buckets[:len(values)] = values
+    buckets = buckets.reshape(row_number, bucket_size)
+    positions = np.sort(np.stack((np.nanargmin(buckets, axis=1), np.nanargmax(buckets, axis=1)), axis=1), axis=1)
+    x = (positions + (np.arange(row_number) * bucket_size)[:, np.newaxis]).ravel()
+    return x, values[x]
+
+
 class Graph(Frame):
     """
     Show the dynamic graphic. It is updated at each change of generation.
+    The lines are created once and their data is replaced, downsampled to the width of the canvas in pixels
     """
     fig = plt.figure(facecolor=(0.851, 0.851, 0.851))
     canvas = None
+    # Beyond this number of points, the points are not marked anymore
+    marker_limit = 50
 
     def init_ui(self, statistics, **kwargs):
-        plt.ylabel('Score')
-        plt.xlabel('Génération')
+        self.statistics = statistics
+        self.axes = self.fig.add_subplot()
+        self.axes.set_xlabel('Génération')
+        self.axes.set_ylabel('Score')
+        self.lines = {
+            column: self.axes.plot([], [], marker='o', label=label)[0]
+            for column, label in (('max', 'Max'), ('mean', 'Mean'), ('min', 'Min'))
+        }
+        self.axes.legend(loc='upper left')
         self.canvas = FigureCanvasTkAgg(self.fig, master=self)
 
-        self.update_graph(statistics)
+        self.update_graph(0, 0)
         self.canvas.get_tk_widget().pack()
         self.pack()
 
-    def update_graph(self, statistics):
+    def update_graph(self, start, index):
         """
-        Method used to update the graphic canvas
+        Method used to update the graphic canvas, showing the statistics of the records from start to index,
+        which are the generations of a population up to the current one
         """
-        plt.clf()
-
-        plt.plot([i[0] for i in statistics], marker='o')
-        plt.plot([i[1] for i in statistics], marker='o')
-        plt.plot([i[2] for i in statistics], marker='o')
-
-        plt.legend(['Max', 'Mean', 'Min'], loc='upper left')
-        plt.xlabel('Génération')
-        plt.ylabel('Score')
-        self.canvas.draw()
+        generation = index - start
+        bucket_number = max(int(self.fig.get_figwidth() * self.fig.dpi), 1)
+        low, high = np.inf, -np.inf
+        for column, line in self.lines.items():
+            x, y = downsample(self.statistics[column][start:index + 1], bucket_number)
+            line.set_data(x, y)
+            line.set_marker('o' if len(x) <= self.marker_limit else '')
+            if len(y):
+                low, high = min(low, y.min()), max(high, y.max())
+        self.axes.set_xlim(0, max(generation, 1))
+        if low <= high:
+            margin = (high - low) * 0.05 or 1
+            self.axes.set_ylim(low - margin, high + margin)
+        # Redraws are coalesced when the generation changes faster than the canvas is drawn
+        self.canvas.draw_idle()
 
 
 class UI(tk.Tk):
@@ -176,47 +223,48 @@ class UI(tk.Tk):
         self.title(title)
         self.config = config
 
-        with open(config['populations_save'], 'rb') as pop_file:
-            self.individuals = pickle.load(pop_file)
-
-        with open(config['statistics'], 'rb') as stats_file:
-            self.statistics = pickle.load(stats_file)
+        # The generations are read from the run log only when they are displayed
+        self.run_log = RunLog(config['run_log'])
+        # The index of the displayed record of the run log
+        self.record_cursor = 0
 
-        max_cell = sorted(config['given_cells'], key=lambda cell: cell.position.coordinates[0])[-1]
-        grid_size = (max_cell.position.coordinates[0] + 1) / 3
+        grid_size = self.run_log.grid_spec.width / 3
 
         self.Header = Header()
-        self.Sodoku = Sodoku(sep_index=grid_size, individual=self.individuals[0], given_cells=config['given_cells'])
+        self.Sodoku = Sodoku(
+            sep_index=grid_size, individual=self.run_log.individual(0), given_cells=self.run_log.given_cells
+        )
         self.Cursor = Cursor(
-            next_gen=lambda: self.update_generation(self.Cursor.generation_cursor.get() + 1),
-            previous_gen=lambda: self.update_generation(self.Cursor.generation_cursor.get() - 1)
+            next_gen=lambda: self.update_generation(self.record_cursor + 1),
+            previous_gen=lambda: self.update_generation(self.record_cursor - 1)
         )
 
         self.Score = Score()
-        self.Graph = Graph(statistics=self.statistics)
+        self.Graph = Graph(statistics=self.run_log.records)
 
         self.update_generation(0)
 
-    def update_generation(self, new_gen_cursor):
+    def update_generation(self, new_record_cursor):
         """
         Method call when the current generation has changed.
+        Only this generation is read from the run log, the graph reads the statistics of its population up to it
         """
-        try:
-            individual = self.individuals[new_gen_cursor]
-        except IndexError:
-            individual = self.individuals[0]
-            new_gen_cursor = 0
+        # Going past the last generation goes back to the first one, and conversely
+        self.record_cursor = new_record_cursor = new_record_cursor % len(self.run_log)
+        individual = self.run_log.individual(new_record_cursor)
 
-        generation_stats = self.statistics[new_gen_cursor]
+        generation_stats = self.run_log[new_record_cursor]
+        population, generation = self.run_log.position(new_record_cursor)
         self.Sodoku.individual = individual
-        self.Cursor.generation_cursor.set(new_gen_cursor)
+        self.Cursor.population_cursor.set(population)
+        self.Cursor.generation_cursor.set(generation)
         self.Cursor.individual_cursor.set(generation_stats[3])
 
         self.Score.max_score.set(round(generation_stats[0], 2))
         self.Score.mean_score.set(round(generation_stats[1], 2))
         self.Score.min_score.set(round(generation_stats[2], 2))
 
-        self.Graph.update_graph(self.statistics[:new_gen_cursor + 1])
+        self.Graph.update_graph(self.run_log.population_start(new_record_cursor), new_record_cursor)
 
         self.Sodoku.fill()
 
@@ -225,8 +273,4 @@ class UI(tk.Tk):
 
 
 if __name__ == '__main__':
-    UI('Sudoku',
-       {'populations_save': './data/population_sudoku_2019-11-20_10:35:44.350536',
-        'statistics': './data/stats_sudoku_2019-11-20_10:35:44.350282',
-        'given_cells': small_6x6_112,
-        }).show()
+    UI('Sudoku', {'run_log': './data/run_log_sudoku_2019-11-20_10:35:44.350536'}).show()
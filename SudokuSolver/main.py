@@ -1,7 +1,11 @@
+import os
 from time import time
 
+from SudokuSolver.exact import ExactEngine
 from SudokuSolver.genetic import GeneticEngine
 from SudokuSolver.grids import *
+from SudokuSolver.presolve import presolve
+from SudokuSolver.runlog import RunLogWriter
 from SudokuSolver.sudoku import Sudoku
 
 
@@ -9,11 +13,12 @@ def with_gui_report():
     from SudokuSolver.graphic_interface import UI
     given_cells = small_6x6_112
     engine = GeneticEngine(individual_class=Sudoku, population_size=1000, given_cells=given_cells)
+    # Every generation is appended to the run log while the engine runs
+    run_log_file = engine.data_file_path('run_log')
+    engine.observers.append(RunLogWriter(run_log_file))
     best_solutions, stats = engine.run()
-    stats_file = engine.save_stats_to_file(stats, 'stats')
-    population_file = engine.save_stats_to_file(best_solutions, 'population')
 
-    config = {'statistics': stats_file, 'given_cells': given_cells, 'populations_save': population_file}
+    config = {'run_log': run_log_file}
     ui = UI('Sodoku solver', config)
     ui.show()
 
@@ -22,13 +27,44 @@ def with_gui_report():
 
 def pure_cmd():
     start = time()
-    engine = GeneticEngine(individual_class=Sudoku, population_size=1000, given_cells=small_6x6_112)
+    presolved = presolve(small_6x6_112)
+    print(presolved.fixed_cell_number, "cells fixed by the presolver")
+    if presolved.solved:
+        print(round(time() - start, 2), "seconds")
+        print(Sudoku(presolved.given_cells), sep="")
+        return
+    engine = GeneticEngine(
+        individual_class=Sudoku,
+        population_size=1000,
+        given_cells=presolved.given_cells,
+        candidates=presolved.candidates,
+        phase_timing=True,
+    )
     best_solutions, stats = engine.run()
-    print(round(time() - start, 2), "seconds")
+    print(round(time() - start, 2), "seconds,", len(engine.restarts), "restarts")
+    print(engine.phase_timers)
     # engine.save_stats_to_file(stats)
     print(best_solutions[-1], sep="")
 
 
+def islands_cmd():
+    start = time()
+    engine = GeneticEngine(individual_class=Sudoku, population_size=1000, given_cells=small_6x6_112)
+    best_solutions, stats, islands_stats = engine.run_islands(island_number=os.cpu_count() or 1)
+    print(round(time() - start, 2), "seconds")
+    print(best_solutions[-1], sep="")
+
+
+def exact_cmd():
+    start = time()
+    engine = ExactEngine(individual_class=Sudoku, given_cells=small_6x6_112)
+    best_solutions, stats = engine.run()
+    print(round(time() - start, 4), "seconds")
+    print(best_solutions[-1], sep="")
+
+
 if __name__ == '__main__':
     pure_cmd()
+    # islands_cmd()
+    # exact_cmd()
     # with_gui_report()
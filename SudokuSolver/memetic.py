@@ -0,0 +1,50 @@
+"""
+This file contains the local search stage of the genetic algorithm engine, which makes it a memetic algorithm :
+after being scored, the best individuals of each generation are improved by Individual.local_search
+"""
+from typing import List
+
+import numpy as np
+
+
+class LocalSearch:
+    """
+    Runs Individual.local_search with a budget of budget changes on the elite_number best individuals
+    of each generation, and counts the improvements
+    """
+
+    def __init__(self, elite_number: int = 5, budget: int = 100):
+        if elite_number < 1 or budget < 1:
+            raise ValueError("A local search needs at least one individual and a budget of one change")
+        self.elite_number = elite_number
+        self.budget = budget
+        # The number of searches run, the number of them which improved their individual and the sum of the gains
+        self.searches = 0
+        self.improvements = 0
+        self.total_gain = 0.0
+
+    def apply(self, population: list, scores: List[float]):
+        """Improves the best individuals of population in place. Their scores are updated in scores"""
+        elite_number = min(self.elite_number, len(population))
+        elite = np.argpartition(np.asarray(scores, dtype=np.float64), -elite_number)[-elite_number:]
+        for index in elite.tolist():
+            individual = population[index]
+            individual.local_search(self.budget)
+            score = individual.normalized_rate()
+            self.searches += 1
+            if score > scores[index]:
+                self.improvements += 1
+                self.total_gain += score - scores[index]
+            scores[index] = score
+
+    def merge(self, other: "LocalSearch"):
+        """Add the counts of other to self"""
+        self.searches += other.searches
+        self.improvements += other.improvements
+        self.total_gain += other.total_gain
+
+    def __str__(self):
+        return (
+            f"local search : {self.improvements} of {self.searches} searches improved their individual, "
+            f"mean gain {self.total_gain / (self.improvements or 1):.3f}"
+        )
@@ -0,0 +1,201 @@
+"""
+This file contains the observers of the genetic algorithm engine.
+An observer receives a GenerationReport after each generation : it may display it, save it or ignore it.
+The engine only builds the reports, all the formatting is done by the observers
+"""
+import csv
+import json
+import sys
+from time import monotonic
+from typing import Any, Dict, List, NamedTuple, Optional, TextIO
+
+
+class GenerationReport(NamedTuple):
+    """The stats of a generation, as sent to the observers"""
+
+    generation: int
+    best_score: float
+    mean_score: float
+    smallest_score: float
+    # The index of the best individual in the population
+    best_id: int
+    mean_mutation_probability: float
+    mean_mating_probability: float
+    # Why the population stopped evolving after this generation, None if it keeps evolving (see ExitReasons)
+    exit_reason: Optional[int]
+    best_individual: Any
+    # The time spent in each phase of the generation in nanoseconds, if the engine measures it (see PhaseTimers)
+    phase_times: Optional[Dict[str, int]] = None
+
+    def stats(self) -> dict:
+        """
+        Returns the report without the best individual, made of numbers only.
+        Phase times are flattened into <phase>_ns items
+        """
+        stats = self._asdict()
+        del stats["best_individual"], stats["phase_times"]
+        for phase, nanoseconds in (self.phase_times or {}).items():
+            stats[f"{phase}_ns"] = nanoseconds
+        return stats
+
+
+class GenerationObserver:
+    """
+    Abstract observer
+    """
+
+    def notify(self, report: GenerationReport):
+        """Called by the engine after each generation"""
+        raise NotImplementedError
+
+    def notify_islands(self, generation: int, best_scores: List[float]):
+        """
+        Called by the island model after each migration, with the generation count
+        and the best score reached by each island. Ignored by default
+        """
+
+    def close(self):
+        """Called by the engine at the end of a run. Release the resources of the observer here"""
+
+
+class NullObserver(GenerationObserver):
+    """Ignores every report"""
+
+    def notify(self, report: GenerationReport):
+        pass
+
+
+class StdoutObserver(GenerationObserver):
+    """
+    Shows the advancement of the algorithm to the user, on a single line updated at each report
+    """
+
+    def __init__(self):
+        self.header_shown = False
+
+    def notify(self, report: GenerationReport):
+        if not self.header_shown:
+            # Display the headers to improve the readability of later logs
+            print("max ", "avg ", "min ", "mut-pr", "mat-pr", "g-nbr", sep="\t")
+            self.header_shown = True
+        text = (
+            f"{format(report.best_score, '<4.2f')}\t"
+            f"{format(report.mean_score, '<4.2f')}\t"
+            f"{format(report.smallest_score, '<4.2f')}\t"
+            f"{format(report.mean_mutation_probability, '<4.4f')}\t"
+            f"{format(report.mean_mating_probability, '<4.4f')}\t"
+            f"{report.generation}"
+        )
+        print(f"\r{text}", end="")
+
+    def notify_islands(self, generation: int, best_scores: List[float]):
+        if not self.header_shown:
+            print(*(f"isl-{index}" for index in range(len(best_scores))), "g-nbr", sep="\t")
+            self.header_shown = True
+        text = "\t".join(format(score, "<4.2f") for score in best_scores)
+        print(f"\r{text}\t{generation}", end="")
+
+    def close(self):
+        if self.header_shown:
+            print("\n", end="")
+        self.header_shown = False
+
+
+class FileObserver(GenerationObserver):
+    """
+    Abstract observer writing to the file at path, or to stdout if path is "-".
+    The file is opened at the first report. It is not pickled along with the observer
+    """
+
+    def __init__(self, path: str, mode: str = "w"):
+        self.path = path
+        self.mode = mode
+        self.file: Optional[TextIO] = None
+
+    def open(self) -> TextIO:
+        if self.file is None:
+            self.file = sys.stdout if self.path == "-" else open(self.path, self.mode, newline="")
+            self.start()
+        return self.file
+
+    def start(self):
+        """Called when the file has just been opened"""
+
+    def close(self):
+        if self.file is not None and self.file is not sys.stdout:
+            self.file.close()
+        self.file = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["file"] = None
+        return state
+
+
+class JsonLinesObserver(FileObserver):
+    """Writes the stats of each report as a JSON object on its own line"""
+
+    def notify(self, report: GenerationReport):
+        file = self.open()
+        file.write(json.dumps(report.stats()) + "\n")
+        file.flush()
+
+
+class CsvObserver(FileObserver):
+    """
+    Writes the stats of each report as a CSV row. The first row holds the names of the columns,
+    which are the ones of the first report
+    """
+
+    def start(self):
+        self.writer = None
+
+    def notify(self, report: GenerationReport):
+        self.open()
+        stats = report.stats()
+        if self.writer is None:
+            self.writer = csv.DictWriter(self.file, fieldnames=list(stats), extrasaction="ignore")
+            self.writer.writeheader()
+        self.writer.writerow(stats)
+        self.file.flush()
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state.pop("writer", None)
+        return state
+
+
+class Throttle(GenerationObserver):
+    """
+    Forwards a report to observer only if at least generation_interval generations and time_interval seconds
+    have passed since the last forwarded one. The first report and the last one of a population are always forwarded
+    """
+
+    def __init__(self, observer: GenerationObserver, generation_interval: int = 1, time_interval: float = 0):
+        self.observer = observer
+        self.generation_interval = generation_interval
+        self.time_interval = time_interval
+        self.last_generation: Optional[int] = None
+        self.last_time = 0.0
+
+    def notify(self, report: GenerationReport):
+        now = monotonic()
+        if (
+            self.last_generation is None
+            or report.exit_reason is not None
+            or report.generation < self.last_generation
+            or (
+                report.generation - self.last_generation >= self.generation_interval
+                and now - self.last_time >= self.time_interval
+            )
+        ):
+            self.last_generation, self.last_time = report.generation, now
+            self.observer.notify(report)
+
+    def notify_islands(self, generation: int, best_scores: List[float]):
+        # Migrations are rare enough to be always forwarded
+        self.observer.notify_islands(generation, best_scores)
+
+    def close(self):
+        self.last_generation = None
+        self.observer.close()
@@ -0,0 +1,89 @@
+"""
+This file contains an alternative representation of a sudoku solution,
+in which each square (or row) is always a permutation of the values it misses
+"""
+from functools import lru_cache
+from random import random, randrange
+from typing import FrozenSet, Tuple
+
+import numpy as np
+
+from SudokuSolver.sudoku import Cell, GridSpec, Sudoku, build_given_layout
+
+# The kinds of unit which can be kept as permutations, as ordered in GridSpec.units
+ROWS = 0
+COLUMNS = 1
+SQUARES = 2
+
+
+@lru_cache(maxsize=32)
+def build_unit_free_cells(
+    given_cells: FrozenSet[Cell], grid_spec: GridSpec, unit_type: int
+) -> Tuple[Tuple[np.ndarray, ...], Tuple[Tuple[int, ...], ...]]:
+    """
+    Returns, for each unit of unit_type, the indexes of its cells which are not given and the values it misses
+    """
+    template, given_mask = build_given_layout(given_cells, grid_spec)
+    units = grid_spec.units[unit_type * grid_spec.unit_number : (unit_type + 1) * grid_spec.unit_number]
+    free_cells, missing_values = [], []
+    for unit in units:
+        free_cells.append(unit[~given_mask[unit]])
+        given_values = set(template[unit[given_mask[unit]]].tolist())
+        missing_values.append(tuple(value for value in range(1, grid_spec.value_number + 1) if value not in given_values))
+    return tuple(free_cells), tuple(missing_values)
+
+
+class PermutationSudoku(Sudoku):
+    """
+    Represent a potential sudoku solution whose squares always contain each value once.
+    Mutations swap two cells of a square and children get each square from one of their parents,
+    so only the rows and the columns can have conflicts. It greatly reduces the size of the search space.
+    Set permutation_unit_type to ROWS or COLUMNS to keep those units as permutations instead
+    """
+
+    permutation_unit_type = SQUARES
+
+    @property
+    def swap_unit_types(self) -> Tuple[int, ...]:
+        """Local search only swaps cells of the same unit kept as a permutation"""
+        return (self.permutation_unit_type,)
+
+    @property
+    def unit_free_cells(self) -> Tuple[Tuple[np.ndarray, ...], Tuple[Tuple[int, ...], ...]]:
+        """The free cells and the missing values of each unit kept as a permutation"""
+        return build_unit_free_cells(self.given_cells, self.grid_spec, self.permutation_unit_type)
+
+    def randomly_fill(self):
+        """Fill each unit kept as a permutation with a random permutation of the values it misses"""
+        for free_cells, missing_values in zip(*self.unit_free_cells):
+            values = np.array(missing_values, dtype=np.uint8)
+            np.random.shuffle(values)
+            # Zip-like truncation : invalid grids may miss more values than they have free cells
+            self.genome[free_cells] = values[: len(free_cells)]
+        self.unit_counts = self.unit_distinct = self.value_counts = self.score_terms = None
+
+    def mutate(self):
+        """
+        Each cell open to modification has a probability of mutation_probability to be swapped
+        with another one of its unit
+        """
+        cells_to_mutate = self.free_indexes[np.random.random(len(self.free_indexes)) < self.mutation_probability]
+        if not len(cells_to_mutate):
+            return
+        unit_free_cells = self.unit_free_cells[0]
+        first_unit = self.permutation_unit_type * self.grid_spec.unit_number
+        for index in cells_to_mutate.tolist():
+            free_cells = unit_free_cells[self.grid_spec.cell_units[index][self.permutation_unit_type] - first_unit]
+            partner = int(free_cells[randrange(len(free_cells))])
+            if partner != index:
+                self.set_cells(np.array([index, partner]), self.genome[[partner, index]])
+
+    def mate(self, other: "PermutationSudoku") -> "PermutationSudoku":
+        """Each unit kept as a permutation is copied from one of the parents, chosen at random"""
+        units = self.grid_spec.units[
+            self.permutation_unit_type * self.grid_spec.unit_number : (self.permutation_unit_type + 1)
+            * self.grid_spec.unit_number
+        ]
+        from_self = np.zeros(self.grid_spec.cell_number, dtype=bool)
+        from_self[units[[random() < 0.5 for _ in range(len(units))]].ravel()] = True
+        return self.crossover(other, from_self)
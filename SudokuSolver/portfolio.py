@@ -0,0 +1,217 @@
+"""
+This file contains the portfolio solver : it races several strategies on the same puzzle, each one in its own process,
+and returns the first solution found. The other strategies are then asked to stop, and killed if they do not.
+A strategy is the exact solver or a configuration of the genetic algorithm engine :
+its individual class, population size, random seed and any other argument of GeneticEngine.
+
+    python -m SudokuSolver.portfolio hard_3215 --timeout 60
+"""
+import argparse
+import multiprocessing
+from multiprocessing.connection import Connection, wait
+from multiprocessing.synchronize import Event
+from time import perf_counter
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple, Type
+
+from SudokuSolver.batch import build_cells, parse_line, solve_exact
+from SudokuSolver.benchmark import bundled_grids
+from SudokuSolver.genetic import ExitReasons, GeneticEngine, Individual
+from SudokuSolver.permutation import PermutationSudoku
+from SudokuSolver.sudoku import Cell, GridSpec, Sudoku
+
+
+class Strategy(NamedTuple):
+    name: str
+    # "exact" or "genetic"
+    engine: str = "genetic"
+    individual_class: Type[Individual] = Sudoku
+    # None means the default population size of GeneticEngine
+    population_size: Optional[int] = None
+    seed: Optional[int] = None
+    # Other keyword arguments of GeneticEngine, for instance a selection or a restart policy
+    engine_kwargs: Optional[Dict[str, Any]] = None
+
+
+class StrategyResult(NamedTuple):
+    """
+    The outcome of a strategy. The exit reason of the strategies stopped by the portfolio is CANCELLED,
+    and the one of the strategies whose process died without giving a result is CRASHED
+    """
+
+    name: str
+    solution: Optional[List[int]]
+    seconds: float
+    generations: int
+    exit_reason: int
+
+    def __str__(self):
+        return f"{self.name:<24}{ExitReasons.name(self.exit_reason):<18}{self.seconds:>8.2f}s{self.generations:>8}"
+
+
+DEFAULT_STRATEGIES = (
+    Strategy("exact", engine="exact"),
+    Strategy("genetic-500-seed-0", population_size=500, seed=0),
+    Strategy("genetic-1000-seed-1", population_size=1000, seed=1),
+    Strategy("permutation-1000-seed-2", individual_class=PermutationSudoku, population_size=1000, seed=2),
+)
+
+
+def run_strategy(
+    strategy: Strategy,
+    given_cells: Set[Cell],
+    grid_spec: GridSpec,
+    stop: Event,
+    results: Connection,
+    slice_generations: int = 10,
+):
+    """
+    Runs a strategy until it succeeds or stop is set, and sends its StrategyResult through results.
+    A genetic run checks stop every slice_generations generations. Runs in its own process
+    """
+    start = perf_counter()
+    if strategy.engine == "exact":
+        values = [0] * grid_spec.cell_number
+        for cell in given_cells:
+            x, y = cell.position.coordinates
+            values[y * grid_spec.width + x] = cell.value
+        solution, _, exit_reason = solve_exact(values, grid_spec.width)
+        results.send(StrategyResult(strategy.name, solution, perf_counter() - start, 0, exit_reason))
+        return
+
+    strategy.individual_class.seed(strategy.seed)
+    engine = GeneticEngine(
+        strategy.individual_class,
+        strategy.population_size,
+        given_cells=given_cells,
+        grid_spec=grid_spec,
+        observers=[],
+        **(strategy.engine_kwargs or {}),
+    )
+    outcome = engine.run_until(
+        should_stop=lambda: ExitReasons.CANCELLED if stop.is_set() else None, slice_generations=slice_generations
+    )
+    solution = outcome.best_individual.genome.tolist() if outcome.exit_reason == ExitReasons.SUCCESS else None
+    results.send(
+        StrategyResult(strategy.name, solution, perf_counter() - start, outcome.generations, outcome.exit_reason)
+    )
+
+
+def solve_portfolio(
+    given_cells: Set[Cell],
+    strategies: Tuple[Strategy, ...] = DEFAULT_STRATEGIES,
+    grid_spec: Optional[GridSpec] = None,
+    timeout: Optional[float] = None,
+    grace: float = 5,
+) -> Tuple[Optional[StrategyResult], List[StrategyResult]]:
+    """
+    Races strategies on a grid. Returns the result of the first one to succeed (None if none did before timeout
+    seconds) and the results of every strategy, in the order they finished.
+    Once a strategy succeeded, the other ones have grace seconds to stop before being killed
+    """
+    if len({strategy.name for strategy in strategies}) != len(strategies):
+        raise ValueError("The names of the strategies must be unique")
+    grid_spec = grid_spec or GridSpec.from_given_cells(given_cells)
+    stop = multiprocessing.Event()
+    # Each strategy sends its result through its own pipe
+    processes: Dict[str, multiprocessing.Process] = {}
+    receivers: Dict[str, Connection] = {}
+    senders: List[Connection] = []
+    for strategy in strategies:
+        receivers[strategy.name], sender = multiprocessing.Pipe(duplex=False)
+        senders.append(sender)
+        processes[strategy.name] = multiprocessing.Process(
+            target=run_strategy, args=(strategy, given_cells, grid_spec, stop, sender), daemon=True
+        )
+    start = perf_counter()
+    for process in processes.values():
+        process.start()
+    for sender in senders:
+        sender.close()
+
+    def receive(pending: Set[str], timeout: Optional[float]) -> List[StrategyResult]:
+        """
+        Waits at most timeout seconds for some of the pending strategies to finish, and returns their results.
+        A process which exited without sending its result crashed
+        """
+        ready = wait(
+            [receivers[name] for name in pending] + [processes[name].sentinel for name in pending], timeout
+        )
+        received = []
+        for name in pending:
+            if receivers[name].poll():
+                try:
+                    received.append(receivers[name].recv())
+                    continue
+                except EOFError:
+                    pass
+            elif processes[name].sentinel not in ready:
+                continue
+            received.append(StrategyResult(name, None, perf_counter() - start, 0, ExitReasons.CRASHED))
+        return received
+
+    pending = set(processes)
+    winner, finished = None, []
+    try:
+        # Wait for a success, every strategy to finish or the timeout
+        while winner is None and pending:
+            remaining = None if timeout is None else timeout - (perf_counter() - start)
+            if remaining is not None and remaining <= 0:
+                break
+            received = receive(pending, remaining)
+            for result in received:
+                pending.discard(result.name)
+                finished.append(result)
+                if result.exit_reason == ExitReasons.SUCCESS and winner is None:
+                    winner = result
+            if any(result.exit_reason == ExitReasons.NO_SOLUTION for result in received):
+                # No other strategy can succeed
+                break
+    finally:
+        # Ask the other strategies to stop, and collect their results
+        stop.set()
+        grace_end = perf_counter() + grace
+        while pending and grace_end > perf_counter():
+            for result in receive(pending, grace_end - perf_counter()):
+                pending.discard(result.name)
+                finished.append(result)
+        for name in pending:
+            # The exact solver can not be interrupted, and a generation may take long on big populations
+            processes[name].terminate()
+            finished.append(StrategyResult(name, None, perf_counter() - start, 0, ExitReasons.CANCELLED))
+        for name, process in processes.items():
+            process.join()
+            receivers[name].close()
+    return winner, finished
+
+
+def main(arguments: Optional[List[str]] = None):
+    """Command line entry point"""
+    grids = bundled_grids()
+    grid_names = list(grids)
+    parser = argparse.ArgumentParser(description="Race several strategies on a puzzle")
+    parser.add_argument("puzzle", help=f"a one line puzzle or the name of a bundled grid : {', '.join(grid_names)}")
+    parser.add_argument("--timeout", type=float, default=None, help="seconds")
+    parser.add_argument("--no-exact", action="store_true", help="only race genetic strategies")
+    options = parser.parse_args(arguments)
+
+    if options.puzzle in grid_names:
+        given_cells = grids[options.puzzle]
+    else:
+        values, width = parse_line(options.puzzle)
+        given_cells = build_cells(values, width)
+    strategies = tuple(
+        strategy for strategy in DEFAULT_STRATEGIES if not (options.no_exact and strategy.engine == "exact")
+    )
+
+    winner, results = solve_portfolio(given_cells, strategies, timeout=options.timeout)
+    for result in results:
+        print(result)
+    if winner is None:
+        print("No strategy succeeded")
+    else:
+        print(f"{winner.name} won in {winner.seconds:.2f} seconds")
+        print(Sudoku(build_cells(winner.solution, int(round(len(winner.solution) ** 0.5)))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+This file contains a constraint propagation presolver.
+It fills the cells which can be deduced by simple logic before running the genetic algorithm
+"""
+from typing import Dict, List, Optional, Set, Tuple
+
+from SudokuSolver.sudoku import Cell, GridSpec, Position
+
+
+class PresolveResult:
+    """
+    Holds the output of the presolver
+    """
+
+    def __init__(self, given_cells: Set[Cell], candidates: Dict[Tuple[int, int], Tuple[int, ...]], fixed_cell_number):
+        # The initial given cells plus the cells fixed by the presolver
+        self.given_cells = given_cells
+        # The values each remaining unknown cell can still take, by coordinates
+        self.candidates = candidates
+        # The number of cells fixed by the presolver
+        self.fixed_cell_number = fixed_cell_number
+
+    @property
+    def solved(self) -> bool:
+        """True if the presolver fixed every cell of the grid"""
+        return not self.candidates
+
+
+def presolve(given_cells: Set[Cell], grid_spec: Optional[GridSpec] = None) -> PresolveResult:
+    """
+    Applies naked singles, hidden singles and locked candidates to given_cells until none of them makes progress
+    The dimensions of the grid are inferred from the given cells if grid_spec is not given
+    Raises ValueError if the grid has no solution
+    """
+    grid_spec = grid_spec or GridSpec.from_given_cells(given_cells)
+    width, cell_number, unit_number = grid_spec.width, grid_spec.cell_number, grid_spec.unit_number
+    units = grid_spec.units.tolist()
+    cell_units = grid_spec.cell_units
+    peers = grid_spec.peers.tolist()
+
+    # The candidates of each cell are stored as a bitmask, the bit n meaning the value n is possible
+    all_values = sum(1 << value for value in range(1, width + 1))
+    candidates = [all_values] * cell_number
+    values: List[int] = [0] * cell_number
+
+    def assign(index: int, value: int):
+        """Fix the value of a cell and remove it from the candidates of its peers"""
+        if not candidates[index] & (1 << value):
+            raise ValueError(f"The value {value} is not possible at {index % width}, {index // width}")
+        values[index] = value
+        candidates[index] = 1 << value
+        for peer in peers[index]:
+            if candidates[peer] & (1 << value):
+                candidates[peer] &= ~(1 << value)
+                if not candidates[peer]:
+                    raise ValueError(f"No value is possible at {peer % width}, {peer // width}")
+
+    for given_cell in given_cells:
+        x, y = given_cell.position.coordinates
+        assign(y * width + x, given_cell.value)
+
+    progress = True
+    while progress:
+        progress = False
+
+        # Naked singles : a cell having a single candidate
+        for index in range(cell_number):
+            if not values[index] and (candidates[index] & (candidates[index] - 1)) == 0:
+                assign(index, candidates[index].bit_length() - 1)
+                progress = True
+
+        # Hidden singles : a value having a single possible cell in a unit
+        for unit in units:
+            for value in range(1, width + 1):
+                places = [index for index in unit if candidates[index] & (1 << value)]
+                if not places:
+                    raise ValueError(f"The value {value} has no possible cell in a unit")
+                if len(places) == 1 and not values[places[0]]:
+                    assign(places[0], value)
+                    progress = True
+
+        # Locked candidates : if the places of a value in a unit all belong to another unit,
+        # the value can be removed from the rest of this other unit
+        # (pointing : a square locking a row or a column, claiming : a row or a column locking a square)
+        # Unit types : 0 for rows, 1 for columns, 2 for squares
+        for unit_type, other_unit_types in ((2, (0, 1)), (0, (2,)), (1, (2,))):
+            for unit in units[unit_type * unit_number : (unit_type + 1) * unit_number]:
+                for value in range(1, width + 1):
+                    places = [index for index in unit if not values[index] and candidates[index] & (1 << value)]
+                    if len(places) < 2:
+                        continue
+                    for other_unit_type in other_unit_types:
+                        other_unit = cell_units[places[0]][other_unit_type]
+                        if any(cell_units[place][other_unit_type] != other_unit for place in places[1:]):
+                            continue
+                        for index in set(units[other_unit]).difference(unit):
+                            if candidates[index] & (1 << value):
+                                candidates[index] &= ~(1 << value)
+                                progress = True
+                                if not candidates[index]:
+                                    raise ValueError(f"No value is possible at {index % width}, {index // width}")
+
+    given_indexes = {cell.position.coordinates[1] * width + cell.position.coordinates[0] for cell in given_cells}
+    fixed_cells = {
+        Cell(Position((index % width, index // width)), value)
+        for index, value in enumerate(values)
+        if value and index not in given_indexes
+    }
+    return PresolveResult(
+        given_cells | fixed_cells,
+        {
+            (index % width, index // width): tuple(
+                value for value in range(1, width + 1) if candidates[index] & (1 << value)
+            )
+            for index in range(cell_number)
+            if not values[index]
+        },
+        len(fixed_cells),
+    )
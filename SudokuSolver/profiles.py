@@ -0,0 +1,68 @@
+"""
+This file contains the parameter profiles of the genetic algorithm engine :
+the parameters found by the tuning module to work best on each difficulty of problem.
+GeneticEngine looks the parameters of its problem up in the profiles file given by the SUDOKUSOLVER_PROFILES
+environment variable, if it is set
+"""
+import json
+import os
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional
+
+PROFILES_ENVIRONMENT_VARIABLE = "SUDOKUSOLVER_PROFILES"
+
+
+class Parameters(NamedTuple):
+    """The tunable parameters of the engine. The defaults are the hand-picked historical ones"""
+
+    population_size: int = 1000
+    mutation_probability: float = 0.03
+    mating_probability: float = 0.5
+    # The exponent of the PowerPressure of the roulette selection
+    pressure_exponent: float = 10
+
+
+class ParameterProfiles:
+    """
+    The parameters to use for each difficulty, as returned by Individual.difficulty.
+    They are stored as a JSON object : {difficulty: {parameter: value}}
+    """
+
+    def __init__(self, profiles: Optional[Dict[str, Parameters]] = None):
+        self.profiles: Dict[str, Parameters] = dict(profiles or {})
+
+    def get(self, difficulty: Optional[str]) -> Optional[Parameters]:
+        """Returns the parameters of difficulty, or None if it has no profile"""
+        return self.profiles.get(difficulty)
+
+    def __setitem__(self, difficulty: str, parameters: Parameters):
+        self.profiles[difficulty] = parameters
+
+    def __len__(self):
+        return len(self.profiles)
+
+    def save(self, path: str):
+        with open(path, "w") as file:
+            json.dump({key: parameters._asdict() for key, parameters in self.profiles.items()}, file, indent=1)
+
+    @classmethod
+    def load(cls, path: str) -> "ParameterProfiles":
+        """Raises ValueError if the file does not hold profiles"""
+        with open(path) as file:
+            content = json.load(file)
+        try:
+            return cls({key: Parameters(**parameters) for key, parameters in content.items()})
+        except (AttributeError, TypeError) as error:
+            raise ValueError(f"{path} does not contain parameter profiles : {error}")
+
+
+@lru_cache(maxsize=4)
+def load_profiles_file(path: str) -> ParameterProfiles:
+    """Profiles files are read once per process"""
+    return ParameterProfiles.load(path)
+
+
+def default_profiles() -> Optional[ParameterProfiles]:
+    """Returns the profiles of the file given by the SUDOKUSOLVER_PROFILES environment variable, if it is set"""
+    path = os.environ.get(PROFILES_ENVIRONMENT_VARIABLE)
+    return load_profiles_file(path) if path else None
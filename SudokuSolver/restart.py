@@ -0,0 +1,134 @@
+"""
+This file contains the restart policies of the genetic algorithm engine :
+how to detect that a population is stuck in a local optimum, and what to do about it
+"""
+from typing import List, Optional
+
+
+def population_diversity(population: list) -> float:
+    """
+    Returns the ratio of distinct genomes in population, between 0 and 1.
+    Individuals whose genome_key is None are considered distinct from the others
+    """
+    if not population:
+        return 0
+    keys = [individual.genome_key() for individual in population]
+    uncomparable = sum(key is None for key in keys)
+    return (len(set(key for key in keys if key is not None)) + uncomparable) / len(population)
+
+
+class StallDetector:
+    """
+    Abstract stall detector. It is checked by the engine after each generation without progress
+    """
+
+    def stall_reason(self, state) -> Optional[str]:
+        """Returns why the population of state (a PopulationState) is stuck, or None if it is not"""
+        raise NotImplementedError
+
+
+class HalfTimeStall(StallDetector):
+    """
+    The population is stuck if no progress has been made for half of its generations,
+    once it has run min_generations generations
+    """
+
+    def __init__(self, min_generations: int = 20):
+        self.min_generations = min_generations
+
+    def stall_reason(self, state) -> Optional[str]:
+        if state.generation_count > self.min_generations and state.no_progress_count >= state.generation_count // 2:
+            return f"no progress for {state.no_progress_count} of {state.generation_count} generations"
+        return None
+
+
+class FixedWindowStall(StallDetector):
+    """The population is stuck if no progress has been made for window generations"""
+
+    def __init__(self, window: int = 50):
+        self.window = window
+
+    def stall_reason(self, state) -> Optional[str]:
+        if state.no_progress_count >= self.window:
+            return f"no progress for {state.no_progress_count} generations"
+        return None
+
+
+class DiversityStall(StallDetector):
+    """
+    The population is stuck if the ratio of distinct genomes it contains falls under min_diversity,
+    once it has run min_generations generations : it has converged and mostly evolves clones of the same individuals
+    """
+
+    def __init__(self, min_diversity: float = 0.1, min_generations: int = 20):
+        self.min_diversity = min_diversity
+        self.min_generations = min_generations
+
+    def stall_reason(self, state) -> Optional[str]:
+        if state.generation_count < self.min_generations:
+            return None
+        diversity = population_diversity(state.population)
+        if diversity < self.min_diversity:
+            return f"diversity of {diversity:.3f} after {state.no_progress_count} generations without progress"
+        return None
+
+
+class AnyStall(StallDetector):
+    """The population is stuck as soon as one of detectors says so"""
+
+    def __init__(self, *detectors: StallDetector):
+        self.detectors: List[StallDetector] = list(detectors)
+
+    def stall_reason(self, state) -> Optional[str]:
+        for detector in self.detectors:
+            reason = detector.stall_reason(state)
+            if reason is not None:
+                return reason
+        return None
+
+
+class RestartActions:
+    """
+    Enum used to store what the engine can do with a stuck population
+    """
+
+    # Mutate the whole population several times in a row, except its best individual, and keep evolving it
+    HYPERMUTATION = "hypermutation"
+    # Start from a new population containing copies of the best individuals of the stuck one
+    PARTIAL_RESTART = "partial_restart"
+    # Start from a new population
+    RESTART = "restart"
+
+
+class RestartPolicy:
+    """
+    Describes when a population is stuck and how the engine restarts it.
+    A stuck population first receives up to hypermutation_bursts bursts of hypermutation_strength mutations
+    per individual. When none are left, it is replaced by a new population keeping copies of its keep_best
+    best individuals.
+    The default policy is the historical one : the whole population is replaced when it made no progress
+    for half of its generations
+    """
+
+    def __init__(
+        self,
+        stall_detector: Optional[StallDetector] = None,
+        keep_best: int = 0,
+        hypermutation_bursts: int = 0,
+        hypermutation_strength: int = 5,
+    ):
+        self.stall_detector = stall_detector or HalfTimeStall()
+        self.keep_best = keep_best
+        self.hypermutation_bursts = hypermutation_bursts
+        self.hypermutation_strength = hypermutation_strength
+
+    def stall_reason(self, state) -> Optional[str]:
+        return self.stall_detector.stall_reason(state)
+
+    def action(self, state) -> str:
+        """Returns what should be done with the stuck population of state"""
+        if state.hypermutation_count < self.hypermutation_bursts:
+            return RestartActions.HYPERMUTATION
+        if self.keep_best:
+            return RestartActions.PARTIAL_RESTART
+        return RestartActions.RESTART
@@ -0,0 +1,214 @@
+"""
+This file contains the run log : a compact binary file recording the evolution of a population, generation by generation
+It replaces pickled lists of individuals : a log is appended while the engine runs
+and read through mmap, so that any generation can be loaded without reading the whole file.
+
+Layout (little endian) :
+    header : magic, version, width, square width, square height, cell number,
+             then the given values of the grid, one byte per cell (0 meaning unknown)
+    then one fixed size record per generation : best score, mean score, smallest score, index of the best individual,
+             index of the population in the run, generation number in this population,
+             then the genome of the best individual, one byte per cell,
+             then the time spent in each phase of the generation in nanoseconds (see PhaseTimers), 0 if not measured
+A new population starts each time the engine restarts from new individuals : its generations are numbered from 0
+"""
+import mmap
+import os
+import struct
+from typing import BinaryIO, Dict, FrozenSet, Optional, Tuple
+
+import numpy as np
+
+from SudokuSolver.genetic import Number, PhaseTimers
+from SudokuSolver.observers import GenerationObserver, GenerationReport
+from SudokuSolver.sudoku import Cell, GridSpec, Position, Sudoku
+
+MAGIC = b"SSRL"
+VERSION = 3
+HEADER = struct.Struct("<4sHHHHI")
+
+
+def record_dtype(cell_number: int) -> np.dtype:
+    """The numpy type of a generation record. Reading the records as an array gives each statistic as a column"""
+    return np.dtype(
+        [
+            ("max", "<f8"),
+            ("mean", "<f8"),
+            ("min", "<f8"),
+            ("best_id", "<u4"),
+            ("population", "<u4"),
+            ("generation", "<u4"),
+            ("genome", "u1", (cell_number,)),
+            ("phase_ns", "<u8", (len(PhaseTimers.PHASES),)),
+        ]
+    )
+
+
+def build_header(grid_spec: GridSpec, given_values: np.ndarray) -> bytes:
+    return (
+        HEADER.pack(
+            MAGIC, VERSION, grid_spec.width, grid_spec.square_width, grid_spec.square_height, grid_spec.cell_number
+        )
+        + given_values.astype(np.uint8).tobytes()
+    )
+
+
+class RunLogWriter(GenerationObserver):
+    """
+    Appends generations to the run log at path. As an observer of GeneticEngine, it records each generation of a run,
+    a generation numbered lower than the previous one starting a new population.
+    The file is created with its header at the first generation. If it already exists, the generations are appended
+    after the ones it contains, as a new population, which requires it to describe the same grid.
+    The file stays open until close. It is not pickled along with the writer
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file: Optional[BinaryIO] = None
+        self.dtype: Optional[np.dtype] = None
+        self.population = 0
+        self.last_generation: Optional[int] = None
+
+    def open(self, best_individual: Sudoku) -> BinaryIO:
+        """Opens the file, writing its header if it is new. Returns it"""
+        header = build_header(best_individual.grid_spec, np.where(best_individual.given_mask, best_individual.genome, 0))
+        self.dtype = record_dtype(best_individual.grid_spec.cell_number)
+        file = open(self.path, "ab+")
+        size = file.seek(0, os.SEEK_END)
+        if size:
+            file.seek(0)
+            if file.read(len(header)) != header:
+                file.close()
+                raise ValueError(f"{self.path} is not the run log of the same grid")
+            # An interrupted writer may have left an incomplete record : it is dropped
+            record_number = (size - len(header)) // self.dtype.itemsize
+            file.truncate(len(header) + record_number * self.dtype.itemsize)
+            if record_number:
+                file.seek(len(header) + (record_number - 1) * self.dtype.itemsize)
+                last_record = np.frombuffer(file.read(self.dtype.itemsize), dtype=self.dtype)[0]
+                self.population = int(last_record["population"]) + 1
+        else:
+            file.write(header)
+        self.last_generation = None
+        self.file = file
+        return file
+
+    def append(
+        self,
+        score_stats: Tuple[Number, Number, Number, int],
+        best_individual: Sudoku,
+        generation: int,
+        phase_times: Optional[Dict[str, int]] = None,
+    ):
+        """
+        Write the stats of a generation, as collected by GeneticEngine.evolve, its number in its population,
+        its best individual and the time spent in each phase if it has been measured
+        """
+        file = self.file or self.open(best_individual)
+        if self.last_generation is not None and generation <= self.last_generation:
+            self.population += 1
+        self.last_generation = generation
+        record = np.zeros(1, dtype=self.dtype)
+        phase_ns = [(phase_times or {}).get(phase, 0) for phase in PhaseTimers.PHASES]
+        record[0] = (*score_stats, self.population, generation, best_individual.genome, phase_ns)
+        file.write(record.tobytes())
+
+    def notify(self, report: GenerationReport):
+        self.append(
+            (report.best_score, report.mean_score, report.smallest_score, report.best_id),
+            report.best_individual,
+            report.generation,
+            report.phase_times,
+        )
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["file"] = None
+        return state
+
+
+class RunLog:
+    """
+    Read only access to a run log. Generations are read from the mapped file when they are accessed
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as file:
+            header = file.read(HEADER.size)
+            if len(header) != HEADER.size:
+                raise ValueError(f"{path} is not a run log")
+            magic, version, width, square_width, square_height, cell_number = HEADER.unpack(header)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a run log")
+            if version != VERSION:
+                raise ValueError(f"Unsupported run log version {version}")
+            self.grid_spec = GridSpec.get(width, square_width, square_height)
+            self.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        # An interrupted writer may have left an incomplete record at the end of the file : it is ignored
+        self.header_size = HEADER.size + cell_number
+        self.given_values = np.frombuffer(self.mmap, dtype=np.uint8, count=cell_number, offset=HEADER.size)
+        self.given_cells: FrozenSet[Cell] = frozenset(
+            Cell(Position((index % width, index // width)), value)
+            for index, value in enumerate(self.given_values.tolist())
+            if value
+        )
+        dtype = record_dtype(cell_number)
+        # The records are a view on the mapped file : nothing is read until it is accessed
+        self.records = np.frombuffer(
+            self.mmap, dtype=dtype, count=(len(self.mmap) - self.header_size) // dtype.itemsize, offset=self.header_size
+        )
+        self.population_starts: Optional[np.ndarray] = None
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, generation: int) -> Tuple[float, float, float, int]:
+        """Returns the stats of a generation : best, mean and smallest scores and the index of the best individual"""
+        record = self.records[generation]
+        return float(record["max"]), float(record["mean"]), float(record["min"]), int(record["best_id"])
+
+    def position(self, index: int) -> Tuple[int, int]:
+        """Returns the index of the population of a record and its generation number in this population"""
+        record = self.records[index]
+        return int(record["population"]), int(record["generation"])
+
+    def population_start(self, index: int) -> int:
+        """Returns the index of the first record of the population of the record at index"""
+        if self.population_starts is None:
+            # Computed once, the populations being stored in increasing order
+            self.population_starts = np.flatnonzero(np.diff(self.records["population"])) + 1
+        starts = self.population_starts
+        position = np.searchsorted(starts, index % len(self), side="right")
+        return int(starts[position - 1]) if position else 0
+
+    def phase_times(self, index: int) -> Dict[str, int]:
+        """Returns the time spent in each phase of the generation of a record, in nanoseconds. 0 if not measured"""
+        return dict(zip(PhaseTimers.PHASES, self.records["phase_ns"][index].tolist()))
+
+    def genome(self, index: int) -> np.ndarray:
+        """Returns the genome of the best individual of a record"""
+        return self.records["genome"][index]
+
+    def individual(self, index: int) -> Sudoku:
+        """Returns the best individual of a record"""
+        individual = Sudoku(self.given_cells, grid_spec=self.grid_spec)
+        individual.set_cells(individual.free_indexes, self.genome(index)[individual.free_indexes])
+        return individual
+
+    def close(self):
+        # The views on the mapped file must be released before closing it
+        self.given_values = self.records = None
+        self.mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,140 @@
+"""
+This file contains the parent selection operators of the genetic algorithm engine.
+They work on arrays of scores and return the indexes of the selected parents of a whole generation at once
+"""
+from typing import Callable
+
+import numpy as np
+
+# Pressure transforms are applied to the normalized scores (between 0 and 100) to compute the selection weights.
+# The steeper the transform, the more the best individuals are selected.
+# They are classes rather than closures so that an engine can be sent to worker processes
+
+
+class PowerPressure:
+    """
+    Weights are score ** exponent.
+    Empirical evidence showed that an exponent of 10 provided good results while trying to solve a sudoku
+    """
+
+    def __init__(self, exponent: float = 10):
+        self.exponent = exponent
+
+    def __call__(self, scores: np.ndarray) -> np.ndarray:
+        return scores ** self.exponent
+
+
+class ExponentialPressure:
+    """Weights are exp(score / temperature) (Boltzmann selection). A low temperature means a strong pressure"""
+
+    def __init__(self, temperature: float = 5):
+        self.temperature = temperature
+
+    def __call__(self, scores: np.ndarray) -> np.ndarray:
+        # Subtracting the best score does not change the proportions and prevents overflows
+        return np.exp((scores - scores.max()) / self.temperature)
+
+
+PressureTransform = Callable[[np.ndarray], np.ndarray]
+
+
+def select_by_weight(weights: np.ndarray, number: int) -> np.ndarray:
+    """
+    Returns number indexes drawn with replacement, each index having a probability proportional to its weight.
+    Uniform if every weight is 0
+    """
+    cumulative_weights = np.cumsum(weights, dtype=np.float64)
+    total = cumulative_weights[-1]
+    if not total > 0:
+        return np.random.randint(0, len(weights), size=number)
+    indexes = np.searchsorted(cumulative_weights, np.random.random(number) * total, side="right")
+    # Rounding errors may point right after the last index
+    return np.minimum(indexes, len(weights) - 1)
+
+
+class Selection:
+    """
+    Abstract parent selection operator
+    """
+
+    def select(self, scores: np.ndarray, number: int) -> np.ndarray:
+        """Returns the indexes of number individuals selected according to their scores"""
+        raise NotImplementedError
+
+    def select_parents(self, scores: np.ndarray, couple_number: int) -> np.ndarray:
+        """
+        Returns a (2 x couple_number) array : the indexes of the fathers and the indexes of the mothers
+        of the next generation
+        """
+        return self.select(np.asarray(scores, dtype=np.float64), 2 * couple_number).reshape(2, couple_number)
+
+
+class RouletteSelection(Selection):
+    """
+    Fitness proportionate selection : each individual is selected with a probability proportional
+    to its transformed score
+    """
+
+    def __init__(self, pressure: PressureTransform = PowerPressure(10)):
+        self.pressure = pressure
+
+    def select(self, scores: np.ndarray, number: int) -> np.ndarray:
+        return select_by_weight(self.pressure(scores), number)
+
+
+class StochasticUniversalSampling(RouletteSelection):
+    """
+    Same probabilities as RouletteSelection, but the individuals are selected with evenly spaced pointers
+    on the cumulative weights, so that the number of selections of an individual is close to its expected value
+    """
+
+    def select(self, scores: np.ndarray, number: int) -> np.ndarray:
+        cumulative_weights = np.cumsum(self.pressure(scores), dtype=np.float64)
+        total = cumulative_weights[-1]
+        if not total > 0:
+            return np.random.randint(0, len(scores), size=number)
+        step = total / number
+        pointers = (np.random.random() + np.arange(number)) * step
+        indexes = np.minimum(np.searchsorted(cumulative_weights, pointers, side="right"), len(scores) - 1)
+        # The pointers are sorted : shuffle the indexes so that couples are not made of similar individuals
+        np.random.shuffle(indexes)
+        return indexes
+
+
+class RankSelection(Selection):
+    """
+    Linear ranking selection : the probability of an individual only depends on its rank.
+    pressure is the expected number of selections of the best individual divided by the average one,
+    between 1 (uniform) and 2 (the worst individual is never selected)
+    """
+
+    def __init__(self, pressure: float = 1.5):
+        if not 1 <= pressure <= 2:
+            raise ValueError("The pressure of a rank selection must be between 1 and 2")
+        self.pressure = pressure
+
+    def select(self, scores: np.ndarray, number: int) -> np.ndarray:
+        size = len(scores)
+        if size == 1:
+            return np.zeros(number, dtype=np.intp)
+        ranks = np.empty(size)
+        # 0 for the worst individual, size - 1 for the best one
+        ranks[np.argsort(scores, kind="stable")] = np.arange(size)
+        weights = (2 - self.pressure) + 2 * (self.pressure - 1) * ranks / (size - 1)
+        return select_by_weight(weights, number)
+
+
+class TournamentSelection(Selection):
+    """
+    Each selected individual is the best one among size individuals drawn at random
+    """
+
+    def __init__(self, size: int = 3):
+        if size < 1:
+            raise ValueError("A tournament needs at least one individual")
+        self.size = size
+
+    def select(self, scores: np.ndarray, number: int) -> np.ndarray:
+        contestants = np.random.randint(0, len(scores), size=(number, self.size))
+        winners = np.argmax(scores[contestants], axis=1)
+        return contestants[np.arange(number), winners]
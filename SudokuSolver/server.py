@@ -0,0 +1,331 @@
+"""
+This file contains the solving service : an asyncio server solving puzzles on pools of worker processes
+which stay alive between requests.
+Clients connect through TCP or a Unix socket and send requests as JSON objects, one per line :
+    {"id": 1, "puzzle": "1.3...", "engine": "exact", "deadline": 2.5}
+    {"id": 2, "puzzle": "...", "engine": "genetic", "population_size": 500, "max_generations": 5000}
+    {"cancel": 2}
+Puzzles use the one line notation of the batch module. deadline is a number of seconds, optional.
+Results are sent back as soon as they are known, so not necessarily in the order of the requests :
+    {"id": 1, "solution": "123...", "seconds": 0.004, "generations": 0, "exit_reason": "SUCCESS"}
+exit_reason is DEADLINE or CANCELLED when the request did not complete.
+
+Exact requests are quick : they are grouped in batches sent to their own pool,
+so that they are never stuck behind long genetic runs, which have another pool.
+
+    python -m SudokuSolver.server --port 8765
+    python -m SudokuSolver.server --unix /tmp/sudoku.sock
+"""
+import argparse
+import asyncio
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import count
+from multiprocessing import Manager
+from time import perf_counter, time
+from typing import Dict, List, MutableMapping, NamedTuple, Optional, Set, Tuple
+
+from SudokuSolver.batch import BatchResult, build_cells, format_values, parse_line, solve_lines
+from SudokuSolver.genetic import ExitReasons, GeneticEngine
+from SudokuSolver.sudoku import GridSpec, Sudoku
+
+ENGINES = ("exact", "genetic")
+# The types of JSON values allowed as request ids
+ID_TYPES = (str, int, float, type(None))
+
+
+class SolveRequest(NamedTuple):
+    puzzle: str
+    engine: str = "exact"
+    # The number of seconds allowed to solve the puzzle, counted from the reception of the request. None means no limit
+    deadline: Optional[float] = None
+    # Only used by the genetic engine. None means the defaults of the service
+    population_size: Optional[int] = None
+    max_generations: Optional[int] = None
+
+
+def solve_genetic_until(
+    values: List[int],
+    width: int,
+    population_size: int,
+    max_generations: Optional[int],
+    deadline: Optional[float],
+    key: int,
+    cancelled: MutableMapping[int, bool],
+    slice_generations: int = 10,
+) -> Tuple[List[int], int, int]:
+    """
+    Same as batch.solve_genetic, but the population evolves slice_generations generations at a time
+    and stops as soon as the deadline (a time.time value) is over or key is in cancelled.
+    Runs in a worker process
+    """
+
+    def stop_reason() -> Optional[int]:
+        if key in cancelled:
+            return ExitReasons.CANCELLED
+        if deadline is not None and time() >= deadline:
+            return ExitReasons.DEADLINE
+        return None
+
+    # The request may have waited for a free worker until it was cancelled or too late
+    exit_reason = stop_reason()
+    if exit_reason is not None:
+        return values, 0, exit_reason
+    engine = GeneticEngine(
+        Sudoku, population_size, given_cells=build_cells(values, width), grid_spec=GridSpec.get(width), observers=[]
+    )
+    outcome = engine.run_until(max_generations, stop_reason, slice_generations)
+    solution = values if outcome.best_individual is None else outcome.best_individual.genome.tolist()
+    return solution, outcome.generations, outcome.exit_reason
+
+
+class SolverService:
+    """
+    Solves requests on two pools of worker processes : fast_workers for the exact engine, whose requests are
+    grouped in batches of at most batch_size requests received within batch_delay seconds,
+    and slow_workers for the genetic engine, one request at a time per worker.
+    The pools are created by start and kept until close, so that requests do not pay for starting processes
+    """
+
+    def __init__(
+        self,
+        fast_workers: int = 1,
+        slow_workers: Optional[int] = None,
+        batch_size: int = 64,
+        batch_delay: float = 0.002,
+        population_size: int = 1000,
+        max_generations: Optional[int] = 10000,
+    ):
+        self.fast_workers = fast_workers
+        self.slow_workers = slow_workers or max((os.cpu_count() or 1) - fast_workers, 1)
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.population_size = population_size
+        self.max_generations = max_generations
+        self.fast_pool: Optional[ProcessPoolExecutor] = None
+        self.slow_pool: Optional[ProcessPoolExecutor] = None
+        self.manager = None
+        # The keys of the genetic runs the workers must stop, shared with them through the manager process
+        self.cancelled: Optional[MutableMapping[int, bool]] = None
+        # The keys of the genetic runs sent to the workers and not finished yet
+        self.running_keys: Set[int] = set()
+        self.batch_queue: Optional[asyncio.Queue] = None
+        self.batcher: Optional[asyncio.Task] = None
+        self.keys = count()
+
+    async def start(self):
+        self.fast_pool = ProcessPoolExecutor(self.fast_workers, initializer=Sudoku.seed)
+        self.slow_pool = ProcessPoolExecutor(self.slow_workers, initializer=Sudoku.seed)
+        self.manager = Manager()
+        self.cancelled = self.manager.dict()
+        self.batch_queue = asyncio.Queue()
+        self.batcher = asyncio.create_task(self.run_batcher())
+        # Start the workers now rather than at the first request
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(loop.run_in_executor(self.fast_pool, Sudoku.seed) for _ in range(self.fast_workers)),
+            *(loop.run_in_executor(self.slow_pool, Sudoku.seed) for _ in range(self.slow_workers)),
+        )
+
+    async def close(self):
+        """Stops the service. The running genetic requests are cancelled"""
+        if self.batcher is not None:
+            self.batcher.cancel()
+            self.batcher = None
+        for key in self.running_keys:
+            self.cancelled[key] = True
+        # Waiting for the worker processes blocks : it is done in a thread so that the event loop keeps running
+        loop = asyncio.get_running_loop()
+        for pool in (self.fast_pool, self.slow_pool):
+            if pool is not None:
+                await loop.run_in_executor(None, partial(pool.shutdown, wait=True, cancel_futures=True))
+        self.fast_pool = self.slow_pool = None
+        if self.manager is not None:
+            await loop.run_in_executor(None, self.manager.shutdown)
+            self.manager = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def solve(self, request: SolveRequest) -> BatchResult:
+        """
+        Solves request. Cancelling the task running this coroutine cancels the request :
+        a genetic run is stopped by its worker after its current slice of generations
+        """
+        start = perf_counter()
+        deadline = None if request.deadline is None else time() + request.deadline
+        if request.engine not in ENGINES:
+            raise ValueError(f"Unknown engine {request.engine}")
+        try:
+            values, width = parse_line(request.puzzle)
+        except ValueError:
+            return BatchResult(request.puzzle, 0, 0, "INVALID")
+
+        if request.engine == "exact":
+            future = asyncio.get_running_loop().create_future()
+            await self.batch_queue.put((request.puzzle, deadline, future))
+            try:
+                result = await asyncio.wait_for(future, None if deadline is None else max(deadline - time(), 0))
+            except asyncio.TimeoutError:
+                return BatchResult(request.puzzle, perf_counter() - start, 0, ExitReasons.name(ExitReasons.DEADLINE))
+            return result._replace(seconds=perf_counter() - start)
+
+        key = next(self.keys)
+        running = asyncio.get_running_loop().run_in_executor(
+            self.slow_pool,
+            solve_genetic_until,
+            values,
+            width,
+            request.population_size or self.population_size,
+            request.max_generations or self.max_generations,
+            deadline,
+            key,
+            self.cancelled,
+        )
+        self.running_keys.add(key)
+        running.add_done_callback(partial(self.forget, key))
+        try:
+            solution, generations, exit_reason = await asyncio.shield(running)
+        except asyncio.CancelledError:
+            # The worker can not be interrupted : ask it to stop, without waiting for it
+            self.cancelled[key] = True
+            raise
+        return BatchResult(format_values(solution), perf_counter() - start, generations, ExitReasons.name(exit_reason))
+
+    def forget(self, key: int, _: asyncio.Future):
+        """Called when the genetic run of key is over"""
+        self.running_keys.discard(key)
+        if self.manager is not None:
+            self.cancelled.pop(key, None)
+
+    async def run_batcher(self):
+        """Groups the exact requests in batches and sends them to the fast pool"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.batch_queue.get()]
+            batch_end = loop.time() + self.batch_delay
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(await asyncio.wait_for(self.batch_queue.get(), max(batch_end - loop.time(), 0)))
+                except asyncio.TimeoutError:
+                    break
+            # The requests cancelled or over their deadline while waiting are not sent
+            now = time()
+            batch = [item for item in batch if not item[2].done() and (item[1] is None or item[1] > now)]
+            if batch:
+                running = loop.run_in_executor(self.fast_pool, solve_lines, [item[0] for item in batch], "exact", 0, 0)
+                running.add_done_callback(partial(self.dispatch, [item[2] for item in batch]))
+
+    @staticmethod
+    def dispatch(futures: List[asyncio.Future], done: asyncio.Future):
+        """Gives the results of a batch to the requests still waiting for them"""
+        for index, future in enumerate(futures):
+            if future.done():
+                continue
+            if done.cancelled():
+                future.cancel()
+            elif done.exception() is not None:
+                future.set_exception(done.exception())
+            else:
+                future.set_result(done.result()[index])
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serves the requests of a client, as described in the documentation of this module"""
+        tasks: Dict[object, asyncio.Task] = {}
+
+        async def answer(request_id, request: SolveRequest):
+            try:
+                response = {"id": request_id, **(await self.solve(request))._asdict()}
+            except asyncio.CancelledError:
+                response = {"id": request_id, "solution": request.puzzle, "seconds": 0, "generations": 0}
+                response["exit_reason"] = ExitReasons.name(ExitReasons.CANCELLED)
+            except Exception as error:
+                response = {"id": request_id, "error": str(error)}
+            finally:
+                tasks.pop(request_id, None)
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+
+        try:
+            async for line in reader:
+                try:
+                    message = json.loads(line)
+                    if not isinstance(message, dict):
+                        raise ValueError("a request must be a JSON object")
+                    if "cancel" in message:
+                        if not isinstance(message["cancel"], ID_TYPES):
+                            raise ValueError("an id must be a string, a number or null")
+                        task = tasks.get(message["cancel"])
+                        if task is not None:
+                            task.cancel()
+                        continue
+                    request_id = message.pop("id", None)
+                    if not isinstance(request_id, ID_TYPES):
+                        raise ValueError("an id must be a string, a number or null")
+                    request = SolveRequest(**message)
+                except (ValueError, TypeError) as error:
+                    writer.write(json.dumps({"error": f"Invalid request : {error}"}).encode() + b"\n")
+                    continue
+                if request_id in tasks:
+                    writer.write(json.dumps({"id": request_id, "error": "Duplicate id"}).encode() + b"\n")
+                    continue
+                tasks[request_id] = asyncio.create_task(answer(request_id, request))
+        finally:
+            # The client is gone : its requests are cancelled
+            for task in list(tasks.values()):
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            writer.close()
+
+
+async def serve(host: str = "127.0.0.1", port: int = 8765, unix_path: Optional[str] = None, **service_kwargs):
+    """Runs the service until cancelled. service_kwargs are given to SolverService"""
+    async with SolverService(**service_kwargs) as service:
+        if unix_path is not None:
+            server = await asyncio.start_unix_server(service.handle_connection, unix_path)
+        else:
+            server = await asyncio.start_server(service.handle_connection, host, port)
+        async with server:
+            print("Serving on", ", ".join(str(socket.getsockname()) for socket in server.sockets))
+            await server.serve_forever()
+
+
+def main(arguments: Optional[List[str]] = None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Serve puzzles to pools of solver processes")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="path of a Unix socket to listen to instead of TCP")
+    parser.add_argument("--fast-workers", type=int, default=1, help="number of worker processes for the exact engine")
+    parser.add_argument("--slow-workers", type=int, default=None, help="number of worker processes for the genetic one")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--batch-delay", type=float, default=0.002, help="seconds waited to fill a batch")
+    parser.add_argument("-p", "--population-size", type=int, default=1000)
+    parser.add_argument("-g", "--max-generations", type=int, default=10000)
+    options = parser.parse_args(arguments)
+    try:
+        asyncio.run(
+            serve(
+                options.host,
+                options.port,
+                options.unix,
+                fast_workers=options.fast_workers,
+                slow_workers=options.slow_workers,
+                batch_size=options.batch_size,
+                batch_delay=options.batch_delay,
+                population_size=options.population_size,
+                max_generations=options.max_generations,
+            )
+        )
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+This file contains the solution cache : solved puzzles are stored on disk under the canonical form of their grid,
+so that a puzzle is solved once for all the puzzles it can be turned into by the symmetries of the sudoku :
+relabeling the values, reordering the bands (groups of rows sharing squares), the rows of a band,
+the stacks (groups of columns sharing squares), the columns of a stack,
+and transposing the grid if its squares are actual squares.
+
+The canonical form of a grid is the smallest of its transformations in reading order, unknown cells coming last :
+the transformations putting the given cells first are found at once with numpy for every reordering of the columns,
+by sorting the rows. Only these ones are compared after relabeling the values by order of first appearance
+"""
+import math
+import sqlite3
+from collections import OrderedDict
+from functools import lru_cache
+from itertools import chain, islice, permutations, product
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from SudokuSolver.sudoku import GridSpec
+
+# Beyond this number of reorderings of the columns, only the identity is tried (16x16 grids and bigger) :
+# isomorphic puzzles may then have different canonical forms, which only costs cache misses
+MAX_COLUMN_ORDERS = 100000
+# The maximum number of transformations compared after relabeling the values, for very symmetric grids
+MAX_TIES = 5000
+
+
+class Symmetry(NamedTuple):
+    """
+    A transformation of a grid : the grid is transposed if transposed, then its rows and columns are reordered
+    (row_order[y] being the former index of the row y) and its values are relabeled (value v becoming digits[v])
+    """
+
+    transposed: bool
+    row_order: Tuple[int, ...]
+    column_order: Tuple[int, ...]
+    digits: Tuple[int, ...]
+
+    def apply(self, values: Sequence[int]) -> np.ndarray:
+        """Returns the transformation of a grid, given as one value per cell"""
+        grid = as_grid(values)
+        if self.transposed:
+            grid = grid.T
+        return np.asarray(self.digits, dtype=np.uint8)[grid[np.ix_(self.row_order, self.column_order)]].ravel()
+
+    def revert(self, values: Sequence[int]) -> np.ndarray:
+        """Returns the grid whose transformation is values"""
+        grid = as_grid(values)
+        original = np.empty_like(grid)
+        original[np.ix_(self.row_order, self.column_order)] = np.argsort(self.digits).astype(np.uint8)[grid]
+        return (original.T if self.transposed else original).ravel()
+
+
+def as_grid(values: Sequence[int]) -> np.ndarray:
+    """Returns values as a (y, x) matrix"""
+    values = np.asarray(values, dtype=np.uint8)
+    width = int(round(len(values) ** 0.5))
+    return values.reshape(width, width)
+
+
+@lru_cache(maxsize=8)
+def build_column_orders(grid_spec: GridSpec) -> np.ndarray:
+    """Returns every reordering of the stacks and of the columns of each stack, one per line"""
+    square_width, stack_number = grid_spec.square_width, grid_spec.width // grid_spec.square_width
+    order_number = math.factorial(stack_number) * math.factorial(square_width) ** stack_number
+    if order_number > MAX_COLUMN_ORDERS:
+        return np.arange(grid_spec.width)[np.newaxis]
+    return np.array(
+        [
+            [stack * square_width + column for stack, columns in zip(stacks, orders) for column in columns]
+            for stacks in permutations(range(stack_number))
+            for orders in product(permutations(range(square_width)), repeat=stack_number)
+        ],
+        dtype=np.intp,
+    )
+
+
+def relabel(grid: np.ndarray, value_number: int) -> np.ndarray:
+    """
+    Returns the relabeling of the values of grid numbering them by order of first appearance in reading order.
+    The values which do not appear come next, in increasing order
+    """
+    values, first_indexes = np.unique(grid, return_index=True)
+    appearing = values[np.argsort(first_indexes)]
+    appearing = appearing[appearing != 0]
+    missing = np.setdiff1d(np.arange(1, value_number + 1), appearing)
+    digits = np.zeros(value_number + 1, dtype=np.uint8)
+    digits[np.concatenate((appearing, missing)).astype(np.intp)] = np.arange(1, value_number + 1)
+    return digits
+
+
+def sorted_rows(row_masks: np.ndarray, square_height: int) -> np.ndarray:
+    """
+    row_masks holds the unknown cells of each row of a grid, as integers, for each reordering of the columns.
+    Returns them in the smallest order allowed : sorted in each band, the bands being sorted by their sorted rows
+    """
+    order_number, width = row_masks.shape
+    bands = np.sort(row_masks.reshape(order_number, width // square_height, square_height), axis=2)
+    if width * square_height <= 62:
+        keys = (bands << (width * np.arange(square_height - 1, -1, -1))).sum(axis=2)
+        band_order = np.argsort(keys, axis=1, kind="stable")
+        return np.take_along_axis(bands, band_order[:, :, np.newaxis], axis=1).reshape(order_number, width)
+    return np.array([sorted(band.tolist()) for band in bands]).reshape(order_number, width)
+
+
+def row_orders(row_masks: List[int], square_height: int) -> Iterator[Tuple[int, ...]]:
+    """Yields every order of the rows giving the smallest sequence of row_masks (see sorted_rows)"""
+
+    def band_key(band: List[int]) -> List[int]:
+        return [row_masks[row] for row in band]
+
+    def tied_permutations(items: list, key) -> Iterator[list]:
+        """Every order of items, sorted by key, in which the items having the same key are permuted"""
+        groups, start = [], 0
+        for end in range(1, len(items) + 1):
+            if end == len(items) or key(items[end]) != key(items[start]):
+                groups.append(items[start:end])
+                start = end
+        for orders in product(*(permutations(group) for group in groups)):
+            yield list(chain(*orders))
+
+    bands = [
+        sorted(range(start, start + square_height), key=row_masks.__getitem__)
+        for start in range(0, len(row_masks), square_height)
+    ]
+    bands.sort(key=band_key)
+    for band_order in tied_permutations(bands, band_key):
+        for rows in product(*(tied_permutations(band, row_masks.__getitem__) for band in band_order)):
+            yield tuple(chain(*rows))
+
+
+def canonicalize(values: Sequence[int], grid_spec: Optional[GridSpec] = None) -> Tuple[np.ndarray, Symmetry]:
+    """
+    Returns the canonical form of a grid (one value per cell, 0 meaning unknown) and the symmetry turning it into it.
+    Grids having the same canonical form are transformations of each other
+    """
+    grid = as_grid(values)
+    grid_spec = grid_spec or GridSpec.get(len(grid))
+    width, square_height = grid_spec.width, grid_spec.square_height
+    column_orders = build_column_orders(grid_spec)
+    # The unknown cells of a row are an integer, its first column being the most significant bit
+    weights = 1 << np.arange(width - 1, -1, -1, dtype=np.int64)
+
+    # Find the transformations putting the given cells first, that is the smallest sequences of unknown cells
+    orientations = (False, True) if grid_spec.square_width == square_height else (False,)
+    best_sequence, tied = None, []
+    for transposed in orientations:
+        mask = ((grid.T if transposed else grid) == 0).astype(np.int64)
+        row_masks = (mask[:, column_orders] * weights).sum(axis=2).T
+        sequences = sorted_rows(row_masks, square_height)
+        smallest = sequences[np.lexsort(sequences.T[::-1])[0]]
+        if best_sequence is None or smallest.tolist() < best_sequence.tolist():
+            best_sequence, tied = smallest, []
+        if (smallest == best_sequence).all():
+            tied.extend(
+                (transposed, row_masks[index].tolist(), column_orders[index].tolist())
+                for index in np.flatnonzero((sequences == best_sequence).all(axis=1)).tolist()
+            )
+
+    # Break the ties by comparing the values
+    best_values, best_symmetry = None, None
+    candidates = (
+        (transposed, row_order, column_order)
+        for transposed, masks, column_order in tied
+        for row_order in row_orders(masks, square_height)
+    )
+    for transposed, row_order, column_order in islice(candidates, MAX_TIES):
+        transformed = (grid.T if transposed else grid)[np.ix_(row_order, column_order)]
+        digits = relabel(transformed, grid_spec.value_number)
+        transformed_values = digits[transformed].ravel()
+        if best_values is None or transformed_values.tobytes() < best_values.tobytes():
+            best_values = transformed_values
+            best_symmetry = Symmetry(transposed, tuple(row_order), tuple(column_order), tuple(digits.tolist()))
+    return best_values, best_symmetry
+
+
+class SolutionCache:
+    """
+    Solutions stored in a SQLite database at path, by canonical form of their puzzle and by the puzzle itself,
+    so that repeated puzzles do not need to be canonicalized.
+    The last memory_size puzzles looked up are also kept in memory. Each process must open its own cache
+    """
+
+    def __init__(self, path: str, memory_size: int = 10000):
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=60)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS solutions (grid BLOB PRIMARY KEY, solution BLOB NOT NULL)")
+        self.connection.commit()
+        self.memory_size = memory_size
+        self.memory: "OrderedDict[bytes, List[int]]" = OrderedDict()
+        # The key, canonical form and symmetry of the last puzzle not found, reused when its solution is stored
+        self.last_miss: Optional[Tuple[bytes, np.ndarray, Symmetry]] = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def grid_key(values: np.ndarray, grid_spec: GridSpec) -> bytes:
+        return bytes((grid_spec.width, grid_spec.square_width, grid_spec.square_height)) + values.tobytes()
+
+    def remember(self, key: bytes, solution: List[int]):
+        self.memory[key] = solution
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    def select(self, key: bytes) -> Optional[np.ndarray]:
+        """Returns the solution stored for the grid of key, None if there is none"""
+        row = self.connection.execute("SELECT solution FROM solutions WHERE grid = ?", (key,)).fetchone()
+        return None if row is None else np.frombuffer(row[0], dtype=np.uint8)
+
+    def get(self, values: Sequence[int], grid_spec: Optional[GridSpec] = None) -> Optional[List[int]]:
+        """Returns the solution of the puzzle values, or None if it is not in the cache"""
+        values = np.asarray(values, dtype=np.uint8)
+        grid_spec = grid_spec or GridSpec.get(int(round(len(values) ** 0.5)))
+        key = self.grid_key(values, grid_spec)
+        solution = self.memory.get(key)
+        if solution is None:
+            # A row maps a grid to one of its solutions : the puzzle itself may have been stored
+            stored = self.select(key)
+            if stored is not None:
+                solution = stored.tolist()
+            else:
+                canonical, symmetry = canonicalize(values, grid_spec)
+                stored = self.select(self.grid_key(canonical, grid_spec))
+                if stored is None:
+                    self.last_miss = key, canonical, symmetry
+                    self.misses += 1
+                    return None
+                solution = symmetry.revert(stored).tolist()
+        self.remember(key, solution)
+        self.hits += 1
+        return list(solution)
+
+    def put(self, values: Sequence[int], solution: Sequence[int], grid_spec: Optional[GridSpec] = None):
+        """Stores the solution of the puzzle values, under its canonical form and under values"""
+        values = np.asarray(values, dtype=np.uint8)
+        grid_spec = grid_spec or GridSpec.get(int(round(len(values) ** 0.5)))
+        key = self.grid_key(values, grid_spec)
+        if self.last_miss is not None and self.last_miss[0] == key:
+            _, canonical, symmetry = self.last_miss
+        else:
+            canonical, symmetry = canonicalize(values, grid_spec)
+        self.last_miss = None
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO solutions VALUES (?, ?)",
+            (
+                (self.grid_key(canonical, grid_spec), symmetry.apply(solution).tobytes()),
+                (key, np.asarray(solution, dtype=np.uint8).tobytes()),
+            ),
+        )
+        self.connection.commit()
+        self.remember(key, list(solution))
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -1,6 +1,10 @@
-from random import random, shuffle, choice, randint
+from functools import lru_cache
+from operator import attrgetter
+from random import choice, randint
 from time import time
-from typing import Tuple, Optional, Set, List, Union
+from typing import Tuple, Optional, Set, List, Union, FrozenSet, Dict
+
+import numpy as np
 
 from SudokuSolver.genetic import Individual, Number
 
@@ -13,6 +17,12 @@ class Position:
     def __repr__(self):
         return f"{self.coordinates[0]}, {self.coordinates[1]}"
 
+    def __eq__(self, other):
+        return isinstance(other, Position) and self.coordinates == other.coordinates
+
+    def __hash__(self):
+        return hash(self.coordinates)
+
 
 class Cell:
     """
@@ -36,64 +46,406 @@ class Cell:
     def copy(self) -> "Cell":
         return Cell(self.position, self.value)
 
+    # Cells are compared by value, so that the caches keyed by given cells (see build_sudoku_template)
+    # are hit by the copies of the cells made when pickling them
+    def __eq__(self, other):
+        return isinstance(other, Cell) and self.position == other.position and self.value == other.value
 
-class Sudoku(Individual):
+    def __hash__(self):
+        return hash((self.position, self.value))
+
+
+# The widths of the usual grids, the only ones inferred from given cells (see GridSpec.from_given_cells)
+USUAL_WIDTHS = (4, 6, 8, 9, 10, 12, 16, 25, 36, 49, 64)
+
+
+def square_dimensions(width: int) -> Tuple[int, int]:
     """
-    Represent a potential sudoku solution
+    Returns the usual (square_width, square_height) of a grid of the given width :
+    the squares are as close as possible to actual squares, and wider than high (3x2 for a 6x6 grid)
     """
-    # Probability of having a mutation on a gene
-    # 1 means all genes will be mutated
-    mutation_probability = 0.03
-    # mutation_probability = 0.003
-    mating_probability = 0.5
+    square_height = max(divisor for divisor in range(1, int(width ** 0.5) + 1) if width % divisor == 0)
+    return width // square_height, square_height
 
-    # noinspection PyMissingConstructor
-    def __init__(self, given_cells: Set[Cell]):
-        self.width = 6  # The size of the grid
-        self.height = self.width
-        self.square_width = 3  # The width of a square
-        self.square_height = 2  # Its height
-        self.value_number = max(self.width, self.height)  # The number of potential values for a cell (9 for a 9x9 grid)
+
+class GridSpec:
+    """
+    Immutable description of the dimensions of a grid, along with the index tables derived from them.
+    The tables are computed once per grid size : use GridSpec.get to share the instances.
+    A cell at coordinates (x, y) has the index y * width + x
+    """
+
+    __slots__ = (
+        "width",
+        "height",
+        "square_width",
+        "square_height",
+        "value_number",
+        "cell_number",
+        "unit_number",
+        "units",
+        "rows",
+        "columns",
+        "squares",
+        "cell_units",
+        "peers",
+        "values_bonus",
+    )
+
+    def __init__(self, width: int, square_width: Optional[int] = None, square_height: Optional[int] = None):
+        if square_width is None or square_height is None:
+            square_width, square_height = square_dimensions(width)
         # Check the coherence of the grid parameters
-        assert self.width % self.square_width == 0
-        assert self.height % self.square_height == 0
-        assert self.square_width * self.square_height == self.width
+        if width % square_width or width % square_height or square_width * square_height != width:
+            raise ValueError(f"{square_width}x{square_height} squares can not tile a {width}x{width} grid")
+        if width > 255:
+            raise ValueError("The values of a grid must fit in a byte")
+        set_attribute = super().__setattr__
+        set_attribute("width", width)  # The size of the grid
+        set_attribute("height", width)
+        set_attribute("square_width", square_width)  # The width of a square
+        set_attribute("square_height", square_height)  # Its height
+        set_attribute("value_number", width)  # The number of potential values for a cell (9 for a 9x9 grid)
+        set_attribute("cell_number", width * width)
+        # The number of rows, which is also the number of columns and squares
+        set_attribute("unit_number", width)
+
+        # The indexes of the cells of every row, column and square, one unit per line.
+        # Rows (cells sharing the same x) come first, then columns (same y), then squares
+        grid = np.arange(width * width).reshape(width, width)
+        squares = (
+            grid.reshape(width // square_height, square_height, width // square_width, square_width)
+            .transpose(0, 2, 1, 3)
+            .reshape(-1, square_width * square_height)
+        )
+        units = np.concatenate([grid.T, grid, squares])
+        units.flags.writeable = False
+        set_attribute("units", units)
+        set_attribute("rows", units[:width])
+        set_attribute("columns", units[width : 2 * width])
+        set_attribute("squares", units[2 * width :])
+
+        # For each cell, the line index in units of its row, its column and its square
+        # It is made of python ints since it is read cell by cell
+        cell_units = np.empty((width * width, 3), dtype=np.intp)
+        for unit_type in range(3):
+            type_units = units[unit_type * width : (unit_type + 1) * width]
+            cell_units[type_units.ravel(), unit_type] = np.repeat(np.arange(width) + unit_type * width, width)
+        set_attribute("cell_units", tuple(tuple(units_of_cell) for units_of_cell in cell_units.tolist()))
+
+        # For each cell, the indexes of the other cells sharing a unit with it
+        peers = np.array(
+            [sorted(set(units[cell_units[index]].ravel().tolist()) - {index}) for index in range(width * width)]
+        )
+        peers.flags.writeable = False
+        set_attribute("peers", peers)
+
+        # The bonus given by Sudoku._rate to a value according to its number of occurrences in the grid
+        values_bonus = np.zeros(width * width + 1)
+        values_bonus[[width, width - 1, width - 2]] = (1, 0.5, 0.25)
+        values_bonus.flags.writeable = False
+        set_attribute("values_bonus", values_bonus)
+
+    @staticmethod
+    def get(width: int, square_width: Optional[int] = None, square_height: Optional[int] = None) -> "GridSpec":
+        """Returns the shared GridSpec of these dimensions"""
+        if square_width is None or square_height is None:
+            square_width, square_height = square_dimensions(width)
+        return build_grid_spec(width, square_width, square_height)
+
+    @staticmethod
+    def from_given_cells(given_cells: Set[Cell]) -> "GridSpec":
+        """
+        Infers the dimensions of a grid from its given cells : the grid is the smallest usual one (see USUAL_WIDTHS)
+        containing every cell and every value, and having at most one value missing from the given cells,
+        as a grid having a single solution does. Grids without given cells are 9x9.
+        Raises ValueError if there is no such grid : its GridSpec must then be given explicitly
+        """
+        if not given_cells:
+            return GridSpec.get(9)
+        smallest_width = max(
+            max(max(cell.position.coordinates) + 1 for cell in given_cells), max(cell.value for cell in given_cells)
+        )
+        largest_width = max(smallest_width, len({cell.value for cell in given_cells}) + 1)
+        for width in USUAL_WIDTHS:
+            if smallest_width <= width <= largest_width:
+                return GridSpec.get(width)
+        widths = str(smallest_width) if smallest_width == largest_width else f"{smallest_width} to {largest_width}"
+        raise ValueError(f"No usual grid is {widths} cells wide : the GridSpec of the grid must be given")
+
+    def __setattr__(self, key, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __eq__(self, other):
+        return isinstance(other, GridSpec) and self.dimensions == other.dimensions
+
+    def __hash__(self):
+        return hash(self.dimensions)
+
+    def __reduce__(self):
+        return GridSpec.get, self.dimensions
+
+    def __repr__(self):
+        return f"{type(self).__name__}{self.dimensions}"
+
+    @property
+    def dimensions(self) -> Tuple[int, int, int]:
+        return self.width, self.square_width, self.square_height
+
+
+@lru_cache(maxsize=32)
+def build_grid_spec(width: int, square_width: int, square_height: int) -> GridSpec:
+    """Builds the GridSpec instances shared through GridSpec.get"""
+    return GridSpec(width, square_width, square_height)
+
+
+@lru_cache(maxsize=32)
+def build_given_layout(given_cells: FrozenSet[Cell], grid_spec: GridSpec) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the genome template (given values at their index, 0 elsewhere) and the mask of the given cells.
+    The result is cached and read-only so that every individual of a population shares the same arrays
+    """
+    template = np.zeros(grid_spec.cell_number, dtype=np.uint8)
+    given_mask = np.zeros(grid_spec.cell_number, dtype=bool)
+    for given_cell in given_cells:
+        x, y = given_cell.position.coordinates
+        assert 0 <= x < grid_spec.width
+        assert 0 <= y < grid_spec.height
+        template[y * grid_spec.width + x] = given_cell.value
+        given_mask[y * grid_spec.width + x] = True
+    template.flags.writeable = False
+    given_mask.flags.writeable = False
+    return template, given_mask
+
+
+def count_values(values: np.ndarray, bin_number: int) -> np.ndarray:
+    """
+    Returns the number of occurrences of each value in each line (last axis) of values, with a single bincount
+    The result has the shape of values, except for its last axis which has bin_number items
+    """
+    lines = values.reshape(-1, values.shape[-1])
+    offsets = np.arange(lines.shape[0])[:, np.newaxis] * bin_number
+    counts = np.bincount((lines + offsets).ravel(), minlength=lines.shape[0] * bin_number)
+    return counts.reshape(*values.shape[:-1], bin_number)
+
+
+@lru_cache(maxsize=32)
+def build_candidate_table(
+    candidates: FrozenSet[Tuple[Tuple[int, int], Tuple[int, ...]]], grid_spec: GridSpec
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the candidate values of each cell, padded with 0 up to value_number, and the number of candidates of each cell
+    Cells without candidates can take any value
+    """
+    width, value_number = grid_spec.width, grid_spec.value_number
+    candidate_table = np.zeros((grid_spec.cell_number, value_number), dtype=np.uint8)
+    candidate_table[:] = np.arange(1, value_number + 1)
+    candidate_number = np.full(grid_spec.cell_number, value_number)
+    for (x, y), values in candidates:
+        candidate_table[y * width + x] = 0
+        candidate_table[y * width + x, : len(values)] = values
+        candidate_number[y * width + x] = len(values)
+    candidate_table.flags.writeable = False
+    candidate_number.flags.writeable = False
+    return candidate_table, candidate_number
+
+
+class SudokuTemplate:
+    """
+    Holds everything the individuals solving the same grid have in common : the grid parameters, the given cells,
+    the candidates, floor and maxi. It is built once per grid by build_sudoku_template and shared by reference,
+    so that an individual only owns its genome and its counts
+    """
+
+    __slots__ = (
+        "grid_spec",
+        "given_cells",
+        "candidates",
+        "genome",
+        "given_mask",
+        "free_indexes",
+        "candidate_table",
+        "candidate_number",
+        "unit_free_indexes",
+        "floor",
+        "maxi",
+    )
+
+    def __init__(
+        self,
+        given_cells: FrozenSet[Cell],
+        candidates: Optional[FrozenSet[Tuple[Tuple[int, int], Tuple[int, ...]]]],
+        grid_spec: GridSpec,
+    ):
+        self.grid_spec = grid_spec
+        self.given_cells = given_cells  # The cells given at the beginning
+
+        # The genome of a new individual (the given values, 0 meaning unknown) and the mask of the given cells
+        self.genome, self.given_mask = build_given_layout(given_cells, grid_spec)
+        self.free_indexes = np.flatnonzero(~self.given_mask)
+        self.free_indexes.flags.writeable = False
+        # The indexes of the cells which are not given, for each unit of grid_spec.units
+        self.unit_free_indexes: Tuple[Tuple[int, ...], ...] = tuple(
+            tuple(unit[~self.given_mask[unit]].tolist()) for unit in grid_spec.units
+        )
+
+        # The values each unknown cell can take, as computed by the presolver. Mutations only pick among them
+        self.candidates: Optional[Dict[Tuple[int, int], Tuple[int, ...]]] = None
+        self.candidate_table: Optional[np.ndarray] = None
+        self.candidate_number: Optional[np.ndarray] = None
+        if candidates is not None:
+            self.candidates = dict(candidates)
+            self.candidate_table, self.candidate_number = build_candidate_table(candidates, grid_spec)
 
         # These two variables are the minimum and maximum output of the _rate mathod
         self.floor = (  # It is the minimum possible score
-            (1 * self.width) ** 2
-            + (1 * self.height) ** 2
-            + (1 * self.square_width * self.square_height) ** 2
-            + (0 * self.value_number) ** 2
+            (1 * grid_spec.width) ** 2
+            + (1 * grid_spec.height) ** 2
+            + (1 * grid_spec.square_width * grid_spec.square_height) ** 2
+            + (0 * grid_spec.value_number) ** 2
         )
         self.maxi = (  # The maximum possible score
-            (self.value_number * self.width) ** 2
-            + (self.value_number * self.height) ** 2
-            + (self.value_number * self.square_width * self.square_height) ** 2
-            + (1 * self.value_number) ** 2
+            (grid_spec.value_number * grid_spec.width) ** 2
+            + (grid_spec.value_number * grid_spec.height) ** 2
+            + (grid_spec.value_number * grid_spec.square_width * grid_spec.square_height) ** 2
+            + (1 * grid_spec.value_number) ** 2
         )
 
-        self.given_cells = given_cells  # The cells given at the beginning
+    def __reduce__(self):
+        # Unpickled individuals share the template of their process, like GridSpec instances
+        candidates = None if self.candidates is None else frozenset(self.candidates.items())
+        return build_sudoku_template, (self.given_cells, candidates, self.grid_spec)
 
-        # The solution proposed by self. For now it contains only the given cells
-        self.cells: Set[Cell] = given_cells.copy()
 
-        # Build the unknown cells and fill them with None by default
-        coordinates = set()
-        for given_cell in given_cells:
-            coordinates.add(given_cell.position.coordinates)
-            assert 0 <= given_cell.position.coordinates[0] < self.width
-            assert 0 <= given_cell.position.coordinates[1] < self.height
-        for i in range(self.width):
-            for j in range(self.height):
-                if (i, j) not in coordinates:
-                    self.cells.add(Cell(Position((i, j)), None))
+@lru_cache(maxsize=32)
+def build_sudoku_template(
+    given_cells: FrozenSet[Cell],
+    candidates: Optional[FrozenSet[Tuple[Tuple[int, int], Tuple[int, ...]]]],
+    grid_spec: GridSpec,
+) -> SudokuTemplate:
+    """Builds the SudokuTemplate instances shared by the individuals solving the same grid"""
+    return SudokuTemplate(given_cells, candidates, grid_spec)
 
-        assert len(self.cells) == self.width * self.height
+
+def shared(path: str) -> property:
+    """Returns a read-only property reading path from the SudokuTemplate of an individual"""
+    return property(attrgetter(f"template.{path}"))
+
+
+class Sudoku(Individual):
+    """
+    Represent a potential sudoku solution
+    The grid is stored as a flat uint8 genome indexed by cell position (y * width + x)
+    Everything which does not depend on the genome is stored in a SudokuTemplate shared by the whole population
+    """
+
+    # Individual has no __slots__, so instances still have an attribute dict : it only holds the probabilities
+    # differing from the ones of the class (see inherit_probabilities). The fields below are stored in slots
+    __slots__ = ("template", "genome", "unit_counts", "unit_distinct", "value_counts", "score_terms")
+
+    # Probability of having a mutation on a gene
+    # 1 means all genes will be mutated
+    mutation_probability = 0.03
+    # mutation_probability = 0.003
+    mating_probability = 0.5
+    # The kinds of unit (0 for rows, 1 for columns, 2 for squares) within which local_search swaps cells
+    swap_unit_types: Tuple[int, ...] = (0, 1, 2)
+
+    grid_spec = shared("grid_spec")
+    width = shared("grid_spec.width")  # The size of the grid
+    height = shared("grid_spec.height")
+    square_width = shared("grid_spec.square_width")  # The width of a square
+    square_height = shared("grid_spec.square_height")  # Its height
+    value_number = shared("grid_spec.value_number")  # The number of potential values for a cell
+    floor = shared("floor")
+    maxi = shared("maxi")
+    given_cells = shared("given_cells")
+    given_mask = shared("given_mask")
+    free_indexes = shared("free_indexes")
+    unit_free_indexes = shared("unit_free_indexes")
+    candidates = shared("candidates")
+    candidate_table = shared("candidate_table")
+    candidate_number = shared("candidate_number")
+
+    # noinspection PyMissingConstructor
+    def __init__(
+        self,
+        given_cells: Set[Cell],
+        candidates: Optional[Dict[Tuple[int, int], Tuple[int, ...]]] = None,
+        grid_spec: Optional[GridSpec] = None,
+    ):
+        # The dimensions of the grid are inferred from the given cells if they are not given
+        self.template = build_sudoku_template(
+            frozenset(given_cells),
+            None if candidates is None else frozenset(candidates.items()),
+            grid_spec or GridSpec.from_given_cells(given_cells),
+        )
+
+        # The solution proposed by self. For now it contains only the given cells, 0 meaning unknown
+        self.genome: np.ndarray = self.template.genome.copy()
+
+        # Number of occurrences of each value in each unit (row, column and square), the number of different values
+        # of each unit, the number of occurrences of each value in the grid and the four terms of the score.
+        # They are updated along with the genome so that a mutation only costs the units it modifies.
+        # They are None until the whole population is counted at once by rate_population
+        self.unit_counts: Optional[np.ndarray] = None
+        self.unit_distinct: Optional[np.ndarray] = None
+        self.value_counts: Optional[np.ndarray] = None
+        self.score_terms: Optional[List[Number]] = None
 
         # Randomly fill the unknown cells
         self.randomly_fill()
 
+    @classmethod
+    def difficulty(
+        cls,
+        given_cells: Set[Cell],
+        candidates: Optional[Dict[Tuple[int, int], Tuple[int, ...]]] = None,
+        grid_spec: Optional[GridSpec] = None,
+    ) -> str:
+        """
+        Returns the size of the grid and a level depending on the ratio of cells left to the genetic algorithm,
+        for instance "9x9/hard". Takes the same arguments as the constructor
+        """
+        grid_spec = grid_spec or GridSpec.from_given_cells(given_cells)
+        free_cell_number = len(candidates) if candidates is not None else grid_spec.cell_number - len(given_cells)
+        ratio = free_cell_number / grid_spec.cell_number
+        level = "easy" if ratio < 0.6 else "medium" if ratio < 0.66 else "hard"
+        return f"{grid_spec.width}x{grid_spec.height}/{level}"
+
+    def spawn(self, genome: np.ndarray) -> "Sudoku":
+        """
+        Returns a new individual sharing the template of self and owning genome, not counted yet
+        The constructor is bypassed : nothing but the genome is built
+        """
+        new = object.__new__(type(self))
+        new.template = self.template
+        new.genome = genome
+        new.unit_counts = new.unit_distinct = new.value_counts = new.score_terms = None
+        return new
+
+    def inherit_probabilities(self, mutation_probability: float, mating_probability: float):
+        """
+        Set the probabilities of self. They are only stored in the attribute dict of self
+        if they differ from the ones of its class, so that it stays empty for most individuals
+        """
+        if mutation_probability != type(self).mutation_probability:
+            self.mutation_probability = mutation_probability
+        if mating_probability != type(self).mating_probability:
+            self.mating_probability = mating_probability
+
+    @property
+    def cells(self) -> Set[Cell]:
+        """
+        Returns the grid as a set of cells. The given cells are returned as is, the other ones are built on the fly
+        Only meant to be used outside of the engine hot path (display, debugging)
+        """
+        cells = set(self.given_cells)
+        for index in self.free_indexes:
+            value = int(self.genome[index])
+            cells.add(Cell(Position((int(index) % self.width, int(index) // self.width)), value or None))
+        return cells
+
     def build_random_valid_sudoku_values(self, given_values: List[int]) -> List[int]:
         """Returns the list of the missing values to validly fill self"""
         numbers = []
@@ -108,37 +460,118 @@ class Sudoku(Individual):
         return numbers
 
     def clone(self) -> "Individual":
-        new = Sudoku(self.given_cells)
-        # Replace the randomly filled cells by its parent ones
-        # We should probably optimize this by preventing to randomly fill while cloning
-        new.cells = {cell.copy() for cell in self.cells}
-        new.mutation_probability = self.mutation_probability
-        new.mating_probability = self.mating_probability
+        new = self.spawn(self.genome.copy())
+        if self.unit_counts is not None:
+            new.unit_counts = self.unit_counts.copy()
+            new.unit_distinct = self.unit_distinct.copy()
+            new.value_counts = self.value_counts.copy()
+            new.score_terms = self.score_terms.copy()
+        new.inherit_probabilities(self.mutation_probability, self.mating_probability)
         return new
 
     def mate(self, other: "Sudoku") -> "Individual":
         """This method combine two grids by cutting them in two parts and merging one part of each parent"""
-        new = Sudoku(self.given_cells)
+        # 0 means split in the rows, 1 means split in the columns
+        crossover_type = choice([0, 1])
+        index_where_to_split = randint(0, self.width - 2) if crossover_type == 0 else randint(0, self.height - 2)
+        from_self = np.zeros((self.height, self.width), dtype=bool)
+        if crossover_type == 0:
+            # Cells having x < index_where_to_split come from self
+            from_self[:, :index_where_to_split] = True
+        else:
+            # Cells having y < index_where_to_split come from self
+            from_self[:index_where_to_split, :] = True
+        return self.crossover(other, from_self.reshape(-1))
+
+    def crossover(self, other: "Sudoku", from_self: np.ndarray) -> "Sudoku":
+        """
+        Returns a child made of the cells of self where from_self is True and of the cells of other elsewhere
+        """
+        new = self.spawn(np.where(from_self, self.genome, other.genome))
 
         # Choose mutation and mating probability from one parent at random
-        new.mutation_probability = choice((self.mutation_probability, other.mutation_probability))
-        new.mating_probability = choice((self.mating_probability, other.mating_probability))
+        new.inherit_probabilities(
+            choice((self.mutation_probability, other.mutation_probability)),
+            choice((self.mating_probability, other.mating_probability)),
+        )
 
-        # 0 means split in the rows, 1 means split in the columns
-        crossover_type = choice([0, 1])
-        index_where_to_split = randint(0, self.width - 2) if crossover_type == 1 else randint(0, self.height - 2)
-        new.cells = {
-            (f_cell.copy() if f_cell.position.coordinates[crossover_type] < index_where_to_split else m_cell.copy())
-            for f_cell, m_cell in zip(self.cells, other.cells)
-        }
+        if self.unit_counts is not None and other.unit_counts is not None:
+            # The child inherits the counts of the units copied unchanged from one of its parents
+            # Only the units made of cells of both parents are counted again
+            units = self.grid_spec.units
+            units_from_self = from_self[units]
+            all_from_self = units_from_self.all(axis=1)
+            mixed_units = np.flatnonzero(units_from_self.any(axis=1) & ~all_from_self)
+            new.unit_counts = np.where(all_from_self[:, np.newaxis], self.unit_counts, other.unit_counts)
+            new.unit_distinct = np.where(all_from_self, self.unit_distinct, other.unit_distinct)
+            new.unit_counts[mixed_units] = count_values(new.genome[units[mixed_units]], self.value_number + 1)
+            new.unit_distinct[mixed_units] = np.count_nonzero(new.unit_counts[mixed_units], axis=1)
+            # The rows are a partition of the grid
+            new.value_counts = new.unit_counts[: self.grid_spec.unit_number].sum(axis=0, dtype=np.intp)
+            new.update_score_terms()
         return new
 
     def randomly_fill(self):
         """Fill self with random values"""
-        values = self.build_random_valid_sudoku_values([i.value for i in self.given_cells])
-        shuffle(values)
-        for cell, value in zip(self.cells.difference(self.given_cells), values):
-            cell.value = value
+        values = np.array(
+            self.build_random_valid_sudoku_values([int(value) for value in self.genome[self.given_mask]]),
+            dtype=np.uint8,
+        )
+        np.random.shuffle(values)
+        self.genome[self.free_indexes] = values[: len(self.free_indexes)]
+        self.unit_counts = self.unit_distinct = self.value_counts = self.score_terms = None
+
+    def set_counts(self, unit_counts: np.ndarray):
+        """Set the per unit value counts of self, the other counts and the score terms are deduced from them"""
+        self.unit_counts = unit_counts
+        self.unit_distinct = np.count_nonzero(unit_counts, axis=1)
+        self.value_counts = unit_counts[: self.grid_spec.unit_number].sum(axis=0, dtype=np.intp)
+        self.update_score_terms()
+
+    def update_score_terms(self):
+        """Compute the terms of the score from unit_distinct and value_counts"""
+        unit_number = self.grid_spec.unit_number
+        self.score_terms = [int(self.unit_distinct[unit_number * i : unit_number * (i + 1)].sum()) for i in range(3)]
+        self.score_terms.append(float(self.values_bonus(self.value_counts)))
+
+    def set_cells(self, indexes: np.ndarray, values: np.ndarray):
+        """
+        Write values in the cells at indexes of the genome
+        Only the counts of the rows, columns and squares containing these cells are updated
+        """
+        old_values = self.genome[indexes]
+        self.genome[indexes] = values
+        if self.unit_counts is None:
+            return
+
+        cell_units = self.grid_spec.cell_units
+        values_bonus = self.grid_spec.values_bonus
+        unit_counts, unit_distinct, value_counts, score_terms = (
+            self.unit_counts,
+            self.unit_distinct,
+            self.value_counts,
+            self.score_terms,
+        )
+        # Only a few cells are modified at once, so plain python loops are faster than numpy calls here
+        for index, old_value, value in zip(indexes.tolist(), old_values.tolist(), values.tolist()):
+            if old_value == value:
+                continue
+            for unit_type, unit in enumerate(cell_units[index]):
+                unit_counts[unit, old_value] -= 1
+                if unit_counts[unit, old_value] == 0:
+                    unit_distinct[unit] -= 1
+                    score_terms[unit_type] -= 1
+                unit_counts[unit, value] += 1
+                if unit_counts[unit, value] == 1:
+                    unit_distinct[unit] += 1
+                    score_terms[unit_type] += 1
+            for changed_value, step in ((old_value, -1), (value, 1)):
+                if changed_value:
+                    score_terms[3] -= values_bonus[value_counts[changed_value]]
+                    value_counts[changed_value] += step
+                    score_terms[3] += values_bonus[value_counts[changed_value]]
+                else:
+                    value_counts[changed_value] += step
 
     def _rate(self) -> Number:
         """
@@ -154,49 +587,91 @@ class Sudoku(Individual):
         feel free to modify these operations.
         For example, if you want to increase the importance of having correct columns, you may apply **3 to it.
         """
-        rows, columns, squares = {}, {}, {}
-        values_count = {}
-        for cell in self.cells:
-            row_key = cell.position.coordinates[0]
-            column_key = cell.position.coordinates[1]
-            square_key = (
-                cell.position.coordinates[0] // self.square_width,
-                cell.position.coordinates[1] // self.square_height,
-            )
-            value_key = cell.value
-            if row_key not in rows:
-                rows[row_key] = set()
-            rows[row_key].add(cell.value)
-            if column_key not in columns:
-                columns[column_key] = set()
-            columns[column_key].add(cell.value)
-            if square_key not in squares:
-                squares[square_key] = set()
-            squares[square_key].add(cell.value)
-            if value_key not in values_count:
-                values_count[value_key] = 0
-            values_count[value_key] += 1
-        return (
-            sum([len(it) for it in rows.values()]) ** 2
-            + sum([len(it) for it in columns.values()]) ** 2
-            + sum([len(it) for it in squares.values()]) ** 2
-            + sum(
-                [
-                    {self.value_number: 1, self.value_number - 1: 0.5, self.value_number - 2: 0.25}.get(value, 0)
-                    for value in values_count.values()
-                ]
-            )
-            ** 2
-        )
+        if self.unit_counts is None:
+            self.set_counts(self.count_units(self.genome[np.newaxis])[0])
+        rows, columns, squares, values = self.score_terms
+        return rows ** 2 + columns ** 2 + squares ** 2 + float(values) ** 2
+
+    def count_units(self, genomes: np.ndarray) -> np.ndarray:
+        """
+        Returns the number of occurrences of each value (0 included) in each unit of each genome
+        genomes is a (population_size x cells) matrix of grids sharing the parameters of self
+        """
+        units = self.grid_spec.units
+        return count_values(genomes[:, units], self.value_number + 1).astype(np.uint8)
+
+    def values_bonus(self, value_counts: np.ndarray) -> np.ndarray:
+        """Returns the last term of _rate (before being squared) from the number of occurrences of each value"""
+        values_bonus = self.grid_spec.values_bonus
+        return values_bonus[value_counts[..., 1:]].sum(axis=-1)
+
+    @classmethod
+    def rate_population(cls, population: List["Sudoku"]) -> List[Number]:
+        """
+        Scores the whole population, every individual being expected to solve the same grid
+        The individuals which have never been counted are counted all at once,
+        the other ones reuse the counts updated by mutate and mate
+        """
+        not_counted = [individual for individual in population if individual.unit_counts is None]
+        if not_counted:
+            unit_counts = not_counted[0].count_units(np.stack([individual.genome for individual in not_counted]))
+            for individual, individual_unit_counts in zip(not_counted, unit_counts):
+                individual.set_counts(individual_unit_counts)
+        return [individual.normalized_rate() for individual in population]
+
+    def local_search(self, budget: int):
+        """
+        Min-conflicts hill climbing : swap a cell whose value is duplicated in one of its units with another free cell
+        of one of its units, and keep the swap only if it improves the score. At most budget swaps are tried
+        """
+        score = self._rate()
+        cell_units = self.grid_spec.cell_units
+        unit_free_indexes = self.unit_free_indexes
+        swap_unit_types = self.swap_unit_types
+        genome, unit_counts = self.genome, self.unit_counts
+
+        def find_conflicts() -> List[int]:
+            return [
+                index
+                for index, value in zip(self.free_indexes.tolist(), genome[self.free_indexes].tolist())
+                if any(unit_counts[unit, value] > 1 for unit in cell_units[index])
+            ]
+
+        conflicts = find_conflicts()
+        for _ in range(budget):
+            if not conflicts:
+                break
+            index = choice(conflicts)
+            partner = choice(unit_free_indexes[cell_units[index][choice(swap_unit_types)]])
+            if partner == index or genome[partner] == genome[index]:
+                continue
+            swapped = np.array([index, partner])
+            self.set_cells(swapped, genome[swapped[::-1]])
+            new_score = self._rate()
+            if new_score > score:
+                score = new_score
+                conflicts = find_conflicts()
+            else:
+                # Undo the swap
+                self.set_cells(swapped, genome[swapped[::-1]])
+
+    def genome_key(self) -> bytes:
+        """The genome itself is the key : every individual of a population solves the same grid"""
+        return self.genome.tobytes()
 
     def mutate(self):
         """
         Apply a random mutation on randomly chosen cells open to modification
         """
-        for cell_to_mutate in self.cells - self.given_cells:
-            if random() < self.mutation_probability:
-                assert cell_to_mutate not in self.given_cells
-                cell_to_mutate.value = randint(1, self.value_number)
+        cells_to_mutate = self.free_indexes[np.random.random(len(self.free_indexes)) < self.mutation_probability]
+        if not len(cells_to_mutate):
+            return
+        if self.candidate_table is None:
+            values = np.random.randint(1, self.value_number + 1, size=len(cells_to_mutate)).astype(np.uint8)
+        else:
+            choices = (np.random.random(len(cells_to_mutate)) * self.candidate_number[cells_to_mutate]).astype(np.intp)
+            values = self.candidate_table[cells_to_mutate, choices]
+        self.set_cells(cells_to_mutate, values)
         # Un-comment this snippet if you want to allow mutation on mutation and mating probability
         # if random() < self.mutation_probability:
         #     self.mutation_probability = random()
@@ -208,22 +683,33 @@ class Sudoku(Individual):
         """
         This method is able to build an ascii art sudoku grid of arbitrary column, row and square size
         Numbers are represented as letter. Upper meaning given initial number
+        Grids having more than 26 values use numbers instead, followed by a * for given initial numbers
         """
-        letters = {i + 1: letter for i, letter in enumerate("abcdefghijklmnopqrstuvwxyz")}
-        letters[None] = "-"
-        cells: List[List[Union[int, str]]] = [[0 for __ in range(self.width)] for _ in range(self.height)]
-        for cell in self.cells - self.given_cells:
-            cells[cell.position.coordinates[1]][cell.position.coordinates[0]] = letters[cell.value]
-        for given_cell in self.given_cells:
-            cells[given_cell.position.coordinates[1]][given_cell.position.coordinates[0]] = letters[
-                given_cell.value
-            ].upper()
+        if self.value_number <= 26:
+            symbols = {i + 1: letter for i, letter in enumerate("abcdefghijklmnopqrstuvwxyz")}
+            symbols[0] = "-"
+            given_symbols = {value: symbol.upper() for value, symbol in symbols.items()}
+        else:
+            number_width = len(str(self.value_number))
+            symbols = {i: format(i, f">{number_width}") + " " for i in range(1, self.value_number + 1)}
+            symbols[0] = "-" * number_width + " "
+            given_symbols = {value: symbol.rstrip() + "*" for value, symbol in symbols.items()}
+        cells: List[List[Union[int, str]]] = [
+            [
+                given_symbols[value] if given else symbols[value]
+                for value, given in zip(
+                    self.genome[y * self.width : (y + 1) * self.width].tolist(),
+                    self.given_mask[y * self.width : (y + 1) * self.width].tolist(),
+                )
+            ]
+            for y in range(self.height)
+        ]
         for row in cells:
             for i in range(self.width // self.square_width + 1):
                 row.insert(self.square_width * i + i, "|")
         cells: List[Union[int, str]] = [" ".join([str(cell) for cell in row]) for row in cells]
         for i in range(self.height // self.square_height + 1):
-            cells.insert(self.square_height * i + i, "-" * (1 + self.width * 2 + (self.width // self.square_width) * 2))
+            cells.insert(self.square_height * i + i, "-" * len(cells[0 if i == 0 else -1]))
         return "\n".join(cells)
 
 
@@ -232,4 +718,4 @@ if __name__ == "__main__":
     grid = Sudoku({Cell(Position((3, 5)), 8)})
     grid.randomly_fill()
     print(grid.normalized_rate())
-    print("\n".join([str(it) for it in grid.cells]))
+    print(grid)
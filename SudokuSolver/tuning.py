@@ -0,0 +1,250 @@
+"""
+This file contains the hyperparameter sweep : it runs the genetic algorithm with several sets of parameters
+on the grids of the grids module, in parallel, and saves the best parameters of each difficulty as a profiles file
+(see the profiles module), which GeneticEngine loads when the SUDOKUSOLVER_PROFILES environment variable gives its path.
+
+Each run is stopped after max_seconds : the sets of parameters are compared on their penalized mean time to solution,
+an unsolved run counting as twice max_seconds.
+
+    python -m SudokuSolver.tuning --samples 16 --halving -o profiles.json --results trials.jsonl
+    SUDOKUSOLVER_PROFILES=profiles.json python -m SudokuSolver.main
+"""
+import argparse
+import json
+import random
+from collections import defaultdict
+from itertools import product
+from multiprocessing import Pool
+from time import perf_counter
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from SudokuSolver.benchmark import bundled_grids
+from SudokuSolver.genetic import ExitReasons, GeneticEngine
+from SudokuSolver.presolve import presolve
+from SudokuSolver.profiles import Parameters, ParameterProfiles
+from SudokuSolver.sudoku import Sudoku
+
+# The values tried for each parameter by default
+DEFAULT_SPACE: Dict[str, Sequence] = {
+    "population_size": (300, 1000, 3000),
+    "mutation_probability": (0.003, 0.01, 0.03, 0.1),
+    "mating_probability": (0.3, 0.5, 0.8),
+    "pressure_exponent": (5, 10, 20),
+}
+
+
+class Trial(NamedTuple):
+    parameters: Parameters
+    grid_name: str
+    seed: int
+    max_seconds: float
+    max_generations: Optional[int]
+
+
+class TrialResult(NamedTuple):
+    """The outcome of a trial"""
+
+    parameters: Parameters
+    grid_name: str
+    difficulty: str
+    seed: int
+    seconds: float
+    generations: int
+    solved: bool
+
+    def to_json(self) -> str:
+        return json.dumps({**self._asdict(), "parameters": self.parameters._asdict()})
+
+
+def grid_candidates(space: Dict[str, Sequence]) -> List[Parameters]:
+    """Returns every combination of the values of space"""
+    names = list(space)
+    return [Parameters(**dict(zip(names, values))) for values in product(*(space[name] for name in names))]
+
+
+def random_candidates(space: Dict[str, Sequence], number: int, seed: Optional[int] = None) -> List[Parameters]:
+    """Returns number distinct combinations of the values of space, drawn at random"""
+    candidates = grid_candidates(space)
+    return random.Random(seed).sample(candidates, min(number, len(candidates)))
+
+
+def valid_grids() -> Dict[str, set]:
+    """Returns the bundled grids which have a solution, by name"""
+    grids = {}
+    for name, given_cells in bundled_grids().items():
+        try:
+            presolve(given_cells)
+        except ValueError:
+            continue
+        grids[name] = given_cells
+    return grids
+
+
+def run_trial(trial: Trial) -> TrialResult:
+    """
+    Solves a grid with the parameters of trial, restarting stuck populations, until it is solved
+    or max_seconds or max_generations is over. Runs in a worker process
+    """
+    given_cells = bundled_grids()[trial.grid_name]
+    Sudoku.seed(trial.seed)
+    engine = GeneticEngine(Sudoku, None, given_cells=given_cells, parameters=trial.parameters, observers=[])
+    start = perf_counter()
+    # The time limit is checked every 10 generations
+    outcome = engine.run_until(
+        trial.max_generations,
+        lambda: ExitReasons.DEADLINE if perf_counter() - start >= trial.max_seconds else None,
+    )
+    return TrialResult(
+        trial.parameters,
+        trial.grid_name,
+        Sudoku.difficulty(given_cells),
+        trial.seed,
+        perf_counter() - start,
+        outcome.generations,
+        outcome.exit_reason == ExitReasons.SUCCESS,
+    )
+
+
+def penalized_time(results: Iterable[TrialResult], max_seconds: float) -> float:
+    """The mean time to solution, an unsolved trial counting as twice max_seconds"""
+    return float(np.mean([result.seconds if result.solved else 2 * max_seconds for result in results]))
+
+
+def describe(parameters: Parameters, results: List[TrialResult], max_seconds: float) -> str:
+    """Returns the distribution of the times to solution of results, on one line"""
+    times = np.array([result.seconds if result.solved else np.inf for result in results])
+    return (
+        f"{parameters.population_size:>6}{parameters.mutation_probability:>8}{parameters.mating_probability:>6}"
+        f"{parameters.pressure_exponent:>6}  solved {np.isfinite(times).mean():>4.0%}"
+        f"  median {np.median(times):>7.2f}s  p90 {np.percentile(times, 90, method='higher'):>7.2f}s"
+        f"  penalized {penalized_time(results, max_seconds):>7.2f}s"
+    )
+
+
+class Sweep:
+    """
+    Evaluates sets of parameters on cases (grid name and seed couples) in a pool of worker processes.
+    The results are kept, so that a set of parameters is never run twice on the same case
+    """
+
+    def __init__(
+        self,
+        cases: List[Tuple[str, int]],
+        max_seconds: float = 30,
+        max_generations: Optional[int] = None,
+        workers: Optional[int] = None,
+        results_path: Optional[str] = None,
+    ):
+        self.cases = cases
+        self.max_seconds = max_seconds
+        self.max_generations = max_generations
+        self.workers = workers
+        self.results_path = results_path
+        self.results: Dict[Tuple[Parameters, Tuple[str, int]], TrialResult] = {}
+
+    def evaluate(self, candidates: List[Parameters], case_number: Optional[int] = None) -> List[Parameters]:
+        """
+        Runs candidates on the first case_number cases (all of them by default).
+        Returns the candidates from the best to the worst
+        """
+        cases = self.cases[:case_number]
+        trials = [
+            Trial(parameters, grid_name, seed, self.max_seconds, self.max_generations)
+            for parameters in candidates
+            for grid_name, seed in cases
+            if (parameters, (grid_name, seed)) not in self.results
+        ]
+        results_file = open(self.results_path, "a") if self.results_path else None
+        try:
+            with Pool(self.workers) as pool:
+                for result in pool.imap_unordered(run_trial, trials):
+                    self.results[result.parameters, (result.grid_name, result.seed)] = result
+                    if results_file is not None:
+                        print(result.to_json(), file=results_file, flush=True)
+        finally:
+            if results_file is not None:
+                results_file.close()
+        return sorted(
+            candidates,
+            key=lambda parameters: penalized_time(self.case_results(parameters, case_number), self.max_seconds),
+        )
+
+    def case_results(self, parameters: Parameters, case_number: Optional[int] = None) -> List[TrialResult]:
+        """Returns the results of parameters on the first case_number cases which it has been run on"""
+        return [
+            self.results[parameters, case] for case in self.cases[:case_number] if (parameters, case) in self.results
+        ]
+
+    def successive_halving(self, candidates: List[Parameters], eta: int = 2, min_cases: int = 1) -> List[Parameters]:
+        """
+        Runs every candidate on min_cases cases, keeps the best 1/eta of them and runs them on eta times more cases,
+        until a single candidate is left or every case is used. Returns the last candidates, from the best to the worst
+        """
+        case_number = min(min_cases, len(self.cases))
+        while True:
+            candidates = self.evaluate(candidates, case_number)
+            if len(candidates) == 1 or case_number == len(self.cases):
+                return candidates
+            candidates = candidates[: max(len(candidates) // eta, 1)]
+            case_number = min(case_number * eta, len(self.cases))
+
+
+def main(arguments: Optional[List[str]] = None):
+    """Command line entry point"""
+    grids = valid_grids()
+    parser = argparse.ArgumentParser(description="Search the best parameters of the genetic algorithm by difficulty")
+    parser.add_argument("-g", "--grids", nargs="+", choices=list(grids), default=list(grids))
+    parser.add_argument("-s", "--seeds", nargs="+", type=int, default=[0, 1, 2])
+    parser.add_argument("--population-sizes", nargs="+", type=int, default=DEFAULT_SPACE["population_size"])
+    parser.add_argument(
+        "--mutation-probabilities", nargs="+", type=float, default=DEFAULT_SPACE["mutation_probability"]
+    )
+    parser.add_argument("--mating-probabilities", nargs="+", type=float, default=DEFAULT_SPACE["mating_probability"])
+    parser.add_argument("--pressure-exponents", nargs="+", type=float, default=DEFAULT_SPACE["pressure_exponent"])
+    parser.add_argument("--samples", type=int, help="number of combinations drawn at random instead of all of them")
+    parser.add_argument("--halving", action="store_true", help="use successive halving instead of running every case")
+    parser.add_argument("--max-seconds", type=float, default=30, help="per run")
+    parser.add_argument("-m", "--max-generations", type=int, default=None, help="per run")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--results", help="file where to append the result of each run as a JSON line")
+    parser.add_argument("-o", "--output", help="profiles file where to save the best parameters of each difficulty")
+    parser.add_argument("--random-seed", type=int, default=None, help="seed of the sampling of the combinations")
+    options = parser.parse_args(arguments)
+
+    space = {
+        "population_size": options.population_sizes,
+        "mutation_probability": options.mutation_probabilities,
+        "mating_probability": options.mating_probabilities,
+        "pressure_exponent": options.pressure_exponents,
+    }
+    if options.samples:
+        candidates = random_candidates(space, options.samples, options.random_seed)
+    else:
+        candidates = grid_candidates(space)
+
+    # Each difficulty is tuned on its own grids
+    cases_by_difficulty: Dict[str, List[Tuple[str, int]]] = defaultdict(list)
+    for seed in options.seeds:
+        for grid_name in options.grids:
+            cases_by_difficulty[Sudoku.difficulty(grids[grid_name])].append((grid_name, seed))
+
+    profiles = ParameterProfiles()
+    for difficulty, cases in cases_by_difficulty.items():
+        print(f"{difficulty} : {len(candidates)} candidates on {len(cases)} cases")
+        sweep = Sweep(cases, options.max_seconds, options.max_generations, options.workers, options.results)
+        if options.halving:
+            ranking = sweep.successive_halving(candidates)
+        else:
+            ranking = sweep.evaluate(candidates)
+        for parameters in ranking:
+            print("   ", describe(parameters, sweep.case_results(parameters, None), options.max_seconds))
+        profiles[difficulty] = ranking[0]
+
+    if options.output:
+        profiles.save(options.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -22,5 +22,5 @@ setup(
     ],
     packages=["SudokuSolver"],
     include_package_data=True,
-    install_requires=[],
+    install_requires=["numpy"],
 )
\ No newline at end of file
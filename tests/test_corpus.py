@@ -0,0 +1,98 @@
+"""
+This file contains the tests of the puzzle corpus and of its importer
+"""
+import numpy as np
+import pytest
+
+from SudokuSolver import grids
+from SudokuSolver.corpus import DIGITS, PuzzleCorpus, import_puzzles, import_to_file, iter_chunks
+from SudokuSolver.exact import BitmaskSolver
+from SudokuSolver.sudoku import GridSpec, Sudoku
+
+
+def puzzle_and_solution(given_cells):
+    """Returns the values of a grid, 0 meaning unknown, and of its solution"""
+    puzzle = Sudoku(given_cells).template.genome.copy()
+    solution = BitmaskSolver(GridSpec.get(int(round(len(puzzle) ** 0.5)))).solve(puzzle.tolist())[0]
+    return puzzle, np.array(solution, dtype=np.uint8)
+
+
+def text(values, unknown: str = ".") -> str:
+    return "".join(DIGITS[value] if value else unknown for value in values.tolist())
+
+
+PUZZLES = [puzzle_and_solution(given_cells) for given_cells in (grids.original, grids.normal_225676, grids.hard_3215)]
+
+
+def write(tmp_path, name: str, content: str) -> str:
+    path = tmp_path / name
+    path.write_bytes(content.encode())
+    return str(path)
+
+
+@pytest.mark.parametrize("unknown", [".", "0"])
+@pytest.mark.parametrize("new_line", ["\n", "\r\n"])
+def test_lines(tmp_path, unknown, new_line):
+    lines = [
+        text(PUZZLES[0][0], unknown),
+        "# not a puzzle",
+        "",
+        text(PUZZLES[1][0], unknown) + " a comment",
+        text(PUZZLES[2][0], unknown) + "\tanother one",
+    ]
+    corpus, skipped = import_puzzles(write(tmp_path, "puzzles.txt", new_line.join(lines)))
+    assert corpus.grid_spec == GridSpec.get(9)
+    np.testing.assert_array_equal(corpus.puzzles, [puzzle for puzzle, _ in PUZZLES])
+    assert corpus.solutions is None
+    assert skipped == 1
+
+
+def test_csv(tmp_path):
+    lines = ["quizzes,solutions"] + [f"{text(puzzle, '0')},{text(solution)}" for puzzle, solution in PUZZLES]
+    corpus, skipped = import_puzzles(write(tmp_path, "puzzles.csv", "\n".join(lines) + "\n"))
+    np.testing.assert_array_equal(corpus.puzzles, [puzzle for puzzle, _ in PUZZLES])
+    np.testing.assert_array_equal(corpus.solutions, [solution for _, solution in PUZZLES])
+    assert skipped == 1
+
+
+def test_sdk(tmp_path):
+    puzzle = PUZZLES[1][0]
+    rows = [text(row) for row in puzzle.reshape(9, 9)]
+    content = "\n".join(["#A comment", "[Puzzle]"] + rows) + "\n"
+    corpus, skipped = import_puzzles(write(tmp_path, "puzzle.sdk", content))
+    np.testing.assert_array_equal(corpus.puzzles, [puzzle])
+    assert skipped == 0
+
+
+def test_letters(tmp_path):
+    puzzle = np.zeros(256, dtype=np.uint8)
+    puzzle[:16] = np.arange(1, 17)
+    corpus, _ = import_puzzles(write(tmp_path, "puzzles.txt", text(puzzle) + "\n" + text(puzzle).lower()))
+    assert corpus.grid_spec == GridSpec.get(16)
+    np.testing.assert_array_equal(corpus.puzzles, [puzzle, puzzle])
+    assert corpus.line(0) == text(puzzle)
+
+
+def test_chunks(tmp_path):
+    # The lines crossing the chunk boundaries are parsed with the next chunk
+    path = write(tmp_path, "puzzles.txt", "\n".join(text(puzzle) for puzzle, _ in PUZZLES * 20))
+    puzzles = np.concatenate([chunk for _, chunk, _, _ in iter_chunks(path, chunk_size=200)])
+    np.testing.assert_array_equal(puzzles, [puzzle for puzzle, _ in PUZZLES * 20])
+
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        list(iter_chunks(write(tmp_path, "puzzles.txt", ""), "json"))
+
+
+def test_corpus_file(tmp_path):
+    lines = [f"{text(puzzle)},{text(solution)}" for puzzle, solution in PUZZLES]
+    output_path = str(tmp_path / "puzzles.sspc")
+    assert import_to_file(write(tmp_path, "puzzles.csv", "\n".join(lines)), output_path) == (len(PUZZLES), 0)
+    with PuzzleCorpus.open(output_path) as corpus:
+        assert len(corpus) == len(PUZZLES)
+        np.testing.assert_array_equal(corpus.puzzles, [puzzle for puzzle, _ in PUZZLES])
+        np.testing.assert_array_equal(corpus.solutions, [solution for _, solution in PUZZLES])
+        assert {(cell.position.coordinates, cell.value) for cell in corpus.given_cells(0)} == {
+            (cell.position.coordinates, cell.value) for cell in grids.original
+        }
@@ -0,0 +1,70 @@
+"""
+This file contains the tests of the canonical forms and of the solution cache
+"""
+import numpy as np
+import pytest
+
+from SudokuSolver import grids
+from SudokuSolver.exact import BitmaskSolver
+from SudokuSolver.solution_cache import SolutionCache, Symmetry, canonicalize
+from SudokuSolver.sudoku import GridSpec, Sudoku
+
+GRIDS = [grids.easy_13553, grids.hard_3215, grids.impossible_521901, grids.small_6x6_112]
+
+
+def puzzle_of(given_cells) -> np.ndarray:
+    """Returns the values of a grid, 0 meaning unknown"""
+    return Sudoku(given_cells).template.genome.copy()
+
+
+def random_symmetry(grid_spec: GridSpec, generator: np.random.Generator) -> Symmetry:
+    """Returns a random transformation of the grids of grid_spec"""
+
+    def order(group_size: int, group_number: int):
+        groups = generator.permutation(group_number)
+        return tuple(int(group * group_size + index) for group in groups for index in generator.permutation(group_size))
+
+    transposed = grid_spec.square_width == grid_spec.square_height and bool(generator.integers(2))
+    digits = (0,) + tuple(int(value) for value in generator.permutation(grid_spec.value_number) + 1)
+    return Symmetry(
+        transposed,
+        order(grid_spec.square_height, grid_spec.width // grid_spec.square_height),
+        order(grid_spec.square_width, grid_spec.width // grid_spec.square_width),
+        digits,
+    )
+
+
+@pytest.mark.parametrize("given_cells", GRIDS)
+def test_revert_canonicalize(given_cells):
+    values = puzzle_of(given_cells)
+    canonical, symmetry = canonicalize(values)
+    np.testing.assert_array_equal(symmetry.apply(values), canonical)
+    np.testing.assert_array_equal(symmetry.revert(canonical), values)
+
+
+@pytest.mark.parametrize("given_cells", GRIDS)
+def test_transformations_share_canonical_form(given_cells):
+    generator = np.random.default_rng(0)
+    values = puzzle_of(given_cells)
+    grid_spec = GridSpec.get(int(round(len(values) ** 0.5)))
+    canonical, _ = canonicalize(values)
+    for _ in range(5):
+        transformed = random_symmetry(grid_spec, generator).apply(values)
+        transformed_canonical, symmetry = canonicalize(transformed)
+        np.testing.assert_array_equal(transformed_canonical, canonical)
+        np.testing.assert_array_equal(symmetry.revert(transformed_canonical), transformed)
+
+
+def test_cache_solves_transformed_puzzles(tmp_path):
+    generator = np.random.default_rng(0)
+    values = puzzle_of(grids.hard_3215)
+    grid_spec = GridSpec.get(int(round(len(values) ** 0.5)))
+    solution = BitmaskSolver(grid_spec).solve(values.tolist())[0]
+    with SolutionCache(str(tmp_path / "solutions.db")) as cache:
+        assert cache.get(values) is None
+        cache.put(values, solution)
+        assert cache.get(values) == solution
+        for _ in range(5):
+            symmetry = random_symmetry(grid_spec, generator)
+            assert cache.get(symmetry.apply(values)) == symmetry.apply(solution).tolist()
+        assert cache.misses == 1
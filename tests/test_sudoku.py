@@ -0,0 +1,75 @@
+"""
+This file contains the tests of the counts Sudoku updates along with its genome
+"""
+import pickle
+import random
+
+import numpy as np
+import pytest
+
+from SudokuSolver import grids
+from SudokuSolver.sudoku import Sudoku
+
+GRIDS = [grids.easy_13553, grids.hard_3215, grids.small_6x6_112]
+
+
+@pytest.fixture(autouse=True)
+def seed():
+    # mate draws from the random module, mutate from numpy
+    random.seed(0)
+    np.random.seed(0)
+
+
+def assert_counts_match_recount(individual: Sudoku):
+    """Checks the incremental counts of individual against the counts of a fresh copy of its genome"""
+    recounted = individual.spawn(individual.genome.copy())
+    Sudoku.rate_population([recounted])
+    np.testing.assert_array_equal(individual.unit_counts, recounted.unit_counts)
+    np.testing.assert_array_equal(individual.unit_distinct, recounted.unit_distinct)
+    np.testing.assert_array_equal(individual.value_counts, recounted.value_counts)
+    assert individual.score_terms == pytest.approx(recounted.score_terms)
+    assert individual.normalized_rate() == pytest.approx(recounted.normalized_rate())
+
+
+@pytest.mark.parametrize("given_cells", GRIDS)
+def test_mutate_keeps_counts(given_cells):
+    individual = Sudoku(given_cells)
+    individual.mutation_probability = 0.2
+    Sudoku.rate_population([individual])
+    for _ in range(50):
+        individual.mutate()
+        assert_counts_match_recount(individual)
+
+
+@pytest.mark.parametrize("given_cells", GRIDS)
+def test_crossover_keeps_counts(given_cells):
+    population = [Sudoku(given_cells) for _ in range(10)]
+    Sudoku.rate_population(population)
+    for _ in range(50):
+        first, second = np.random.choice(len(population), 2, replace=False)
+        child = population[first].mate(population[second])
+        assert_counts_match_recount(child)
+        child.mutate()
+        assert_counts_match_recount(child)
+        population[first] = child
+
+
+def test_crossover_with_random_mask_keeps_counts():
+    first, second = Sudoku(grids.easy_13553), Sudoku(grids.easy_13553)
+    Sudoku.rate_population([first, second])
+    for _ in range(20):
+        child = first.crossover(second, np.random.random(first.grid_spec.cell_number) < 0.5)
+        assert_counts_match_recount(child)
+
+
+def test_local_search_keeps_counts():
+    individual = Sudoku(grids.hard_3215)
+    Sudoku.rate_population([individual])
+    individual.local_search(200)
+    assert_counts_match_recount(individual)
+
+
+def test_unpickled_individuals_share_template():
+    individual = Sudoku(grids.hard_3215)
+    first, second = pickle.loads(pickle.dumps(individual)), pickle.loads(pickle.dumps(individual))
+    assert first.template is second.template is individual.template